@@ -20,17 +20,21 @@
 
 # %%
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
 # 設定顯示選項
-pd.set_option('display.max_columns', None)
+pd.set_option('display.max_columns', 15)
 pd.set_option('display.max_rows', 100)
 pd.set_option('display.width', None)
 pd.set_option('display.max_colwidth', 50)
@@ -53,14 +57,90 @@ print(f"📅 分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 # 載入資料檔案
 print("🔄 載入資料檔案...")
 
+# 低基數欄位 (縣市、行政區、年季) 於載入時轉為 category，後續分組與計數只處理整數代碼
+community_dtypes = {'縣市': 'category', '行政區': 'category', '銷售起始年季': 'category'}
+transaction_dtypes = {'縣市': 'category', '行政區': 'category', '交易年季': 'category'}
+
+# 檔案超過門檻時先以分塊串流統計全檔，取代完整載入，峰值記憶體約為單一區塊
+LARGE_FILE_THRESHOLD_MB = 500
+LARGE_FILE_SAMPLE_ROWS = 200_000
+
+# 大型資料集分塊串流統計：筆數、缺失值、次數分布、數值極值皆可逐塊累加
+def profile_csv_in_chunks(path, count_cols, chunksize=100_000):
+    """分塊讀取 CSV 並累加可結合的統計量，不需將整份檔案載入記憶體 (count_cols 可含多欄 tuple)"""
+    n_rows = 0
+    null_counts = None
+    value_counts = dict.fromkeys(count_cols)
+    numeric_min = numeric_max = None
+
+    for chunk in pd.read_csv(path, encoding='utf-8', chunksize=chunksize):
+        n_rows += len(chunk)
+        chunk_nulls = chunk.isna().sum()
+        null_counts = chunk_nulls if null_counts is None else null_counts.add(chunk_nulls, fill_value=0)
+        for col in count_cols:
+            chunk_counts = chunk[list(col)].value_counts() if isinstance(col, tuple) else chunk[col].value_counts()
+            value_counts[col] = (chunk_counts if value_counts[col] is None
+                                 else value_counts[col].add(chunk_counts, fill_value=0))
+
+        numeric = chunk.select_dtypes('number')
+        chunk_min, chunk_max = numeric.min(), numeric.max()
+        numeric_min = chunk_min if numeric_min is None else pd.concat([numeric_min, chunk_min], axis=1).min(axis=1)
+        numeric_max = chunk_max if numeric_max is None else pd.concat([numeric_max, chunk_max], axis=1).max(axis=1)
+
+    return {
+        'rows': n_rows,
+        'null_counts': null_counts.astype('int64'),
+        'value_counts': {col: vc.astype('int64').sort_values(ascending=False) for col, vc in value_counts.items()},
+        'min': numeric_min,
+        'max': numeric_max
+    }
+
+def load_or_profile_csv(path, dtypes, count_cols, label):
+    """
+    未超過門檻的檔案完整載入；超過門檻時分塊統計全檔，另載入前段樣本供樣本檢視
+    
+    筆數、缺失值與次數分布等可累加統計一律取自分塊統計結果，只有樣本能提供的統計 (數值平均/中位數、
+    價格分布等) 以樣本計算並於輸出中標示
+    
+    Args:
+        path (str): CSV 檔案路徑
+        dtypes (dict): 載入時指定的欄位型別
+        count_cols (list): 分塊統計時累加次數分布的欄位
+        label (str): 顯示用的資料名稱
+        
+    Returns:
+        tuple: (DataFrame, 分塊統計結果；完整載入時為 None)
+    """
+    file_mb = os.path.getsize(path) / 1024**2
+    if file_mb <= LARGE_FILE_THRESHOLD_MB:
+        # 使用 pyarrow 引擎多執行緒解析，字串欄位以 Arrow 連續緩衝區儲存
+        df = pd.read_csv(path, encoding='utf-8', engine='pyarrow', dtype_backend='pyarrow', dtype=dtypes)
+        print(f"✅ {label}載入成功: {df.shape}")
+        return df, None
+    
+    print(f"📦 {label} {file_mb:.0f} MB 超過 {LARGE_FILE_THRESHOLD_MB} MB 門檻，改以分塊串流統計...")
+    profile = profile_csv_in_chunks(path, count_cols)
+    print(f"   總筆數: {profile['rows']:,}")
+    
+    # pyarrow 引擎不支援 nrows，樣本改以預設引擎讀取
+    df = pd.read_csv(path, encoding='utf-8', dtype_backend='pyarrow', dtype=dtypes,
+                     nrows=LARGE_FILE_SAMPLE_ROWS)
+    print(f"⚠️ {label}另載入前 {len(df):,} 筆樣本；筆數、缺失值、次數分布與匹配率取自全檔分塊統計，"
+          f"標示「樣本」的統計以此樣本計算")
+    return df, profile
+
 try:
     # 載入預售社區資料
-    community_df = pd.read_csv('../data/raw/lvr_community_data_test.csv', encoding='utf-8')
-    print(f"✅ 預售社區資料載入成功: {community_df.shape}")
-    
-    # 載入逐筆交易資料  
-    transaction_df = pd.read_csv('../data/raw/lvr_presale_test.csv', encoding='utf-8')
-    print(f"✅ 逐筆交易資料載入成功: {transaction_df.shape}")
+    community_df, community_profile = load_or_profile_csv(
+        '../data/raw/lvr_community_data_test.csv', community_dtypes,
+        ['編號', '縣市', '行政區', ('縣市', '行政區'), '銷售起始年季'], '預售社區資料'
+    )
+
+    # 載入逐筆交易資料
+    transaction_df, transaction_profile = load_or_profile_csv(
+        '../data/raw/lvr_presale_test.csv', transaction_dtypes,
+        ['備查編號', '縣市', '交易年季', '解約情形'], '逐筆交易資料'
+    )
     
 except FileNotFoundError as e:
     print(f"❌ 檔案載入失敗: {e}")
@@ -69,41 +149,106 @@ except Exception as e:
     print(f"❌ 載入過程發生錯誤: {e}")
 
 # %%
+def reduce_mem_usage(df):
+    """將整數欄位向下轉型為可容納資料的最小型別 (int8/16/32)；浮點欄位維持 float64，避免 float32 的精度誤差"""
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+community_df = reduce_mem_usage(community_df)
+transaction_df = reduce_mem_usage(transaction_df)
+print("✅ 數值欄位向下轉型完成")
+
+# %%
+def observed_value_counts(series):
+    """計算次數分布；類別欄位的 value_counts 會列出未出現的類別 (0筆)，此處一併排除"""
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+    # 索引轉回一般字串，排序與 min/max 依字串值比較而非類別代碼
+    counts.index = counts.index.astype(str)
+    return counts
+
+def full_value_counts(df, profile, col):
+    """全檔次數分布：大型檔案取分塊統計結果，否則由已載入資料計算 (col 可為多欄 tuple)"""
+    if profile is None:
+        if isinstance(col, tuple):
+            return df.groupby(list(col), observed=True).size().sort_values(ascending=False)
+        return observed_value_counts(df[col])
+    counts = profile['value_counts'][col]
+    counts = counts[counts > 0]
+    if not isinstance(col, tuple):
+        counts.index = counts.index.astype(str)
+    return counts
+
+# 全檔筆數與缺失值數量 (大型檔案取分塊統計結果)，後續欄位資訊、品質檢查與總結皆以此計算
+community_rows = community_profile['rows'] if community_profile else len(community_df)
+transaction_rows = transaction_profile['rows'] if transaction_profile else len(transaction_df)
+community_nulls = (community_profile['null_counts'].reindex(community_df.columns, fill_value=0)
+                   if community_profile else community_df.isna().sum())
+transaction_nulls = (transaction_profile['null_counts'].reindex(transaction_df.columns, fill_value=0)
+                     if transaction_profile else transaction_df.isna().sum())
+
+# 樣本計算的統計於輸出中附加此標示 (完整載入時為空字串)
+transaction_sample_note = f" (前{len(transaction_df):,}筆樣本)" if transaction_profile else ""
+community_sample_note = f" (前{len(community_df):,}筆樣本)" if community_profile else ""
+
+# 年季分布在格式檢查、時間分析、視覺化與總結皆會用到，首次計算後存入快取
+season_stats = {}
+
+def get_season_counts(key, df, profile, col):
+    """取得依年季排序的全檔次數分布，已計算過則直接回傳快取結果"""
+    if key not in season_stats:
+        season_stats[key] = full_value_counts(df, profile, col).sort_index()
+    return season_stats[key]
+
+# %%
+def estimate_memory_mb(df, sample_size=1000):
+    """估算記憶體用量 (MB)；Arrow/數值欄位直接取緩衝區大小，object 欄位以前 sample_size 筆抽樣推估"""
+    usage = df.memory_usage(deep=False)
+    object_cols = df.select_dtypes(include='object').columns
+    if len(object_cols) > 0:
+        sample = df[object_cols].head(sample_size)
+        usage[object_cols] = sample.memory_usage(deep=True, index=False) * len(df) / max(len(sample), 1)
+    return usage.sum() / 1024**2
+
 # 資料基本資訊檢視
 print("=" * 80)
 print("📊 資料基本資訊總覽")
 print("=" * 80)
 
 print("\n🏘️ 預售社區資料 (lvr_community_data_test.csv)")
-print(f"   資料形狀: {community_df.shape}")
-print(f"   記憶體使用: {community_df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
+print(f"   資料形狀: {(community_rows, community_df.shape[1])}")
+print(f"   記憶體使用{community_sample_note}: {estimate_memory_mb(community_df):.2f} MB")
 
 print("\n🏠 逐筆交易資料 (lvr_presale_test.csv)")  
-print(f"   資料形狀: {transaction_df.shape}")
-print(f"   記憶體使用: {transaction_df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
+print(f"   資料形狀: {(transaction_rows, transaction_df.shape[1])}")
+print(f"   記憶體使用{transaction_sample_note}: {estimate_memory_mb(transaction_df):.2f} MB")
 
 # %%
 # 檢視欄位資訊
 print("\n📋 預售社區資料欄位資訊:")
 print("-" * 50)
+# 缺失值只計算一次 (見上方全檔統計)，非空值數量與品質檢查皆由此推得
 community_info = pd.DataFrame({
     '欄位名稱': community_df.columns,
     '資料型別': community_df.dtypes,
-    '非空值數量': community_df.count(),
-    '缺失值數量': community_df.isnull().sum(),
-    '缺失率(%)': (community_df.isnull().sum() / len(community_df) * 100).round(2)
+    '非空值數量': community_rows - community_nulls,
+    '缺失值數量': community_nulls,
+    '缺失率(%)': (community_nulls / community_rows * 100).round(2)
 })
 print(community_info)
 
 # %%
 print("\n📋 逐筆交易資料欄位資訊:")
 print("-" * 50)
+# 缺失值只計算一次 (見上方全檔統計)，非空值數量與品質檢查皆由此推得
 transaction_info = pd.DataFrame({
     '欄位名稱': transaction_df.columns,
     '資料型別': transaction_df.dtypes,
-    '非空值數量': transaction_df.count(),
-    '缺失值數量': transaction_df.isnull().sum(),
-    '缺失率(%)': (transaction_df.isnull().sum() / len(transaction_df) * 100).round(2)
+    '非空值數量': transaction_rows - transaction_nulls,
+    '缺失值數量': transaction_nulls,
+    '缺失率(%)': (transaction_nulls / transaction_rows * 100).round(2)
 })
 print(transaction_info)
 
@@ -114,12 +259,12 @@ print(transaction_info)
 # 檢視預售社區資料樣本
 print("🔍 預售社區資料前5筆樣本:")
 print("=" * 80)
-display(community_df.head())
+print(community_df.head().to_string(max_cols=15))
 
 # %%
 print("\n🔍 逐筆交易資料前5筆樣本:")
 print("=" * 80)
-display(transaction_df.head())
+print(transaction_df.head().to_string(max_cols=15))
 
 # %%
 # 關鍵欄位格式分析
@@ -128,13 +273,20 @@ print("=" * 50)
 
 # 1. 檢查編號匹配欄位
 print("1️⃣ 資料關聯檢查:")
-community_ids = set(community_df['編號'].dropna())
-transaction_ids = set(transaction_df['備查編號'].dropna())
+# 唯一編號取自全檔次數分布的索引，isin 以雜湊比對取代兩個 Python set 的交集
+community_ids = full_value_counts(community_df, community_profile, '編號').index
+transaction_ids = full_value_counts(transaction_df, transaction_profile, '備查編號').index
+community_id_count = len(community_ids)
+transaction_id_count = len(transaction_ids)
+matched_id_count = int(community_ids.isin(transaction_ids).sum())
 
-print(f"   預售社區唯一編號數: {len(community_ids)}")
-print(f"   交易記錄唯一備查編號數: {len(transaction_ids)}")
-print(f"   可匹配編號數: {len(community_ids & transaction_ids)}")
-print(f"   匹配率: {len(community_ids & transaction_ids) / max(len(community_ids), len(transaction_ids)) * 100:.2f}%")
+print(f"   預售社區唯一編號數: {community_id_count}")
+print(f"   交易記錄唯一備查編號數: {transaction_id_count}")
+# 匹配率只計算一次，供總結報告與結果儲存重複使用
+match_rate = matched_id_count / max(community_id_count, transaction_id_count) * 100
+
+print(f"   可匹配編號數: {matched_id_count}")
+print(f"   匹配率: {match_rate:.2f}%")
 
 # %%
 # 2. 檢查銷售起始時間格式
@@ -146,7 +298,7 @@ for i, time_val in enumerate(sales_start_sample):
 # %%
 # 3. 檢查交易年季格式
 print("\n3️⃣ 交易年季格式檢查:")
-year_season_counts = transaction_df['交易年季'].value_counts().sort_index()
+year_season_counts = get_season_counts('transaction_season', transaction_df, transaction_profile, '交易年季')
 print(f"   交易年季數量: {len(year_season_counts)}")
 print(f"   年季範圍: {year_season_counts.index.min()} ~ {year_season_counts.index.max()}")
 print("\n   前10個年季分布:")
@@ -156,12 +308,15 @@ for ys, count in year_season_counts.head(10).items():
 # %%
 # 4. 檢查解約情形格式
 print("\n4️⃣ 解約情形格式檢查:")
-cancellation_counts = transaction_df['解約情形'].value_counts()
+# 解約筆數由全檔缺失值數量推得；解約記錄樣本仍取自已載入資料
+cancelled_data = transaction_df['解約情形'].dropna()
+
+cancellation_counts = full_value_counts(transaction_df, transaction_profile, '解約情形')
 print(f"   解約情形類別數: {len(cancellation_counts)}")
-print(f"   空值(正常交易): {transaction_df['解約情形'].isnull().sum():,}筆")
+print(f"   空值(正常交易): {transaction_nulls['解約情形']:,}筆")
 
 # 檢查解約記錄樣本
-cancellation_samples = transaction_df[transaction_df['解約情形'].notna()]['解約情形'].head(10)
+cancellation_samples = cancelled_data.head(10)
 print("\n   解約記錄樣本:")
 for i, cancel in enumerate(cancellation_samples):
     print(f"   樣本{i+1}: {cancel}")
@@ -176,24 +331,25 @@ print("=" * 50)
 
 # 縣市分布 - 預售社區
 print("1️⃣ 預售社區縣市分布:")
-community_city_dist = community_df['縣市'].value_counts()
+community_city_dist = full_value_counts(community_df, community_profile, '縣市')
 for city, count in community_city_dist.head(10).items():
-    percentage = count / len(community_df) * 100
+    percentage = count / community_rows * 100
     print(f"   {city}: {count:,}個建案 ({percentage:.1f}%)")
 
 # %%
 # 縣市分布 - 交易記錄
 print("\n2️⃣ 交易記錄縣市分布:")
-transaction_city_dist = transaction_df['縣市'].value_counts()
+transaction_city_dist = full_value_counts(transaction_df, transaction_profile, '縣市')
 for city, count in transaction_city_dist.head(10).items():
-    percentage = count / len(transaction_df) * 100
+    percentage = count / transaction_rows * 100
     print(f"   {city}: {count:,}筆交易 ({percentage:.1f}%)")
 
 # %%
 # 行政區分布統計 (前20名)
 print("\n3️⃣ 主要行政區分布 (前20名):")
 print("\n預售社區:")
-community_district = community_df.groupby(['縣市', '行政區']).size().sort_values(ascending=False)
+# 縣市、行政區為類別欄位，以 observed=True 分組只保留實際存在的組合 (避免笛卡兒積的0筆組合)
+community_district = full_value_counts(community_df, community_profile, ('縣市', '行政區'))
 for (city, district), count in community_district.head(20).items():
     print(f"   {city} {district}: {count}個建案")
 
@@ -207,7 +363,7 @@ print("=" * 50)
 
 # 1. 銷售起始年季分布
 print("1️⃣ 銷售起始年季分布:")
-sales_start_season = community_df['銷售起始年季'].value_counts().sort_index()
+sales_start_season = get_season_counts('sales_start_season', community_df, community_profile, '銷售起始年季')
 print(f"   起始年季範圍: {sales_start_season.index.min()} ~ {sales_start_season.index.max()}")
 print(f"   總年季數: {len(sales_start_season)}")
 
@@ -218,7 +374,7 @@ for season, count in sales_start_season.items():
 # %%
 # 2. 交易年季分布
 print("\n2️⃣ 交易年季分布:")
-transaction_season = transaction_df['交易年季'].value_counts().sort_index()
+transaction_season = get_season_counts('transaction_season', transaction_df, transaction_profile, '交易年季')
 print(f"   交易年季範圍: {transaction_season.index.min()} ~ {transaction_season.index.max()}")
 print(f"   總年季數: {len(transaction_season)}")
 
@@ -238,8 +394,8 @@ print("=" * 50)
 print("1️⃣ 預售社區關鍵欄位品質:")
 community_key_fields = ['編號', '社區名稱', '縣市', '行政區', '戶數', '銷售起始年季']
 for field in community_key_fields:
-    null_count = community_df[field].isnull().sum()
-    null_rate = null_count / len(community_df) * 100
+    null_count = community_nulls[field]
+    null_rate = null_count / community_rows * 100
     print(f"   {field}: 缺失 {null_count} 筆 ({null_rate:.2f}%)")
 
 # %%
@@ -247,37 +403,61 @@ for field in community_key_fields:
 print("\n2️⃣ 交易記錄關鍵欄位品質:")
 transaction_key_fields = ['備查編號', '縣市', '行政區', '交易日期', '交易年季', '交易總價', '建物單價']
 for field in transaction_key_fields:
-    null_count = transaction_df[field].isnull().sum()
-    null_rate = null_count / len(transaction_df) * 100
+    null_count = transaction_nulls[field]
+    null_rate = null_count / transaction_rows * 100
     print(f"   {field}: 缺失 {null_count} 筆 ({null_rate:.2f}%)")
 
 # %%
 # 3. 數值欄位異常值檢查
 print("\n3️⃣ 數值欄位異常值檢查:")
 
+def numeric_summary(series, profile=None):
+    """
+    以 Arrow compute 計算數值摘要 (min/max 單次融合掃描)，鍵值沿用 describe() 命名
+    
+    Args:
+        series: 已載入資料的數值欄位
+        profile: 分塊統計結果；提供時極值改取全檔統計，平均/中位數仍以樣本計算
+    
+    Returns:
+        dict: min、max、mean、50% 四項統計
+    """
+    arr = pa.array(series)
+    min_max = pc.min_max(arr)
+    stats = {
+        'min': min_max['min'].as_py(),
+        'max': min_max['max'].as_py(),
+        'mean': pc.mean(arr).as_py(),
+        '50%': pc.quantile(arr, q=0.5)[0].as_py()
+    }
+    if profile is not None:
+        stats['min'] = profile['min'].get(series.name, stats['min'])
+        stats['max'] = profile['max'].get(series.name, stats['max'])
+    return stats
+
 # 檢查戶數
 print("戶數統計:")
-households_stats = community_df['戶數'].describe()
+households_stats = numeric_summary(community_df['戶數'], community_profile)
 print(f"   最小值: {households_stats['min']}")
 print(f"   最大值: {households_stats['max']}")
-print(f"   平均值: {households_stats['mean']:.1f}")
-print(f"   中位數: {households_stats['50%']:.1f}")
+print(f"   平均值{community_sample_note}: {households_stats['mean']:.1f}")
+print(f"   中位數{community_sample_note}: {households_stats['50%']:.1f}")
 
 # 檢查交易總價
 print("\n交易總價統計 (萬元):")
-price_stats = transaction_df['交易總價'].describe()
+price_stats = numeric_summary(transaction_df['交易總價'], transaction_profile)
 print(f"   最小值: {price_stats['min']}")
 print(f"   最大值: {price_stats['max']}")
-print(f"   平均值: {price_stats['mean']:.1f}")
-print(f"   中位數: {price_stats['50%']:.1f}")
+print(f"   平均值{transaction_sample_note}: {price_stats['mean']:.1f}")
+print(f"   中位數{transaction_sample_note}: {price_stats['50%']:.1f}")
 
 # 檢查建物單價
 print("\n建物單價統計 (萬/坪):")
-unit_price_stats = transaction_df['建物單價'].describe()
+unit_price_stats = numeric_summary(transaction_df['建物單價'], transaction_profile)
 print(f"   最小值: {unit_price_stats['min']}")
 print(f"   最大值: {unit_price_stats['max']}")
-print(f"   平均值: {unit_price_stats['mean']:.1f}")
-print(f"   中位數: {unit_price_stats['50%']:.1f}")
+print(f"   平均值{transaction_sample_note}: {unit_price_stats['mean']:.1f}")
+print(f"   中位數{transaction_sample_note}: {unit_price_stats['50%']:.1f}")
 
 # %% [markdown]
 # ## 7. 解約情形初步分析
@@ -288,9 +468,9 @@ print("🚨 解約情形初步分析")
 print("=" * 50)
 
 # 計算解約統計
-total_transactions = len(transaction_df)
-normal_transactions = transaction_df['解約情形'].isnull().sum()
-cancelled_transactions = transaction_df['解約情形'].notna().sum()
+total_transactions = transaction_rows
+cancelled_transactions = int(transaction_rows - transaction_nulls['解約情形'])
+normal_transactions = total_transactions - cancelled_transactions
 
 print(f"總交易筆數: {total_transactions:,}")
 print(f"正常交易: {normal_transactions:,} 筆 ({normal_transactions/total_transactions*100:.2f}%)")
@@ -299,19 +479,18 @@ print(f"解約交易: {cancelled_transactions:,} 筆 ({cancelled_transactions/to
 # %%
 # 解約模式分析
 if cancelled_transactions > 0:
-    print("\n解約記錄模式分析:")
-    cancelled_data = transaction_df[transaction_df['解約情形'].notna()]['解約情形']
-    
-    # 檢查解約日期格式模式
-    patterns = {}
-    for cancel_str in cancelled_data.head(20):
-        if '全部解約' in str(cancel_str):
-            date_part = str(cancel_str).replace('全部解約', '').strip()
-            if date_part:
-                date_len = len(date_part.split(';')[0])
-                pattern = f"{date_len}位數字"
-                patterns[pattern] = patterns.get(pattern, 0) + 1
-        
+    print(f"\n解約記錄模式分析{transaction_sample_note}:")
+
+    # 檢查解約日期格式模式 (以向量化字串運算取代逐筆迴圈)
+    sample = cancelled_data.head(20)
+    date_parts = (sample[sample.str.contains('全部解約', regex=False)]
+                  .str.replace('全部解約', '', regex=False)
+                  .str.strip())
+    date_parts = date_parts[date_parts != '']
+    # 取第一個分號前的日期段 (Arrow 字串欄位的 extract 需使用具名群組)
+    date_lens = date_parts.str.extract(r'^(?P<date>[^;]*)', expand=False).str.len().astype(int)
+    patterns = (date_lens.astype(str) + '位數字').value_counts(sort=False)
+
     print("   解約日期格式模式:")
     for pattern, count in patterns.items():
         print(f"   {pattern}: {count}筆")
@@ -324,28 +503,30 @@ if cancelled_transactions > 0:
 print("📊 視覺化分析")
 print("=" * 50)
 
-# 1. 縣市分布圓餅圖
-fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+# 1. 縣市分布圓餅圖 (plotly 於瀏覽器端繪製，直接使用已計算的前10名分布)
+community_city_top10 = community_city_dist.head(10)
+transaction_city_top10 = transaction_city_dist.head(10)
+
+fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'pie'}, {'type': 'pie'}]],
+                    subplot_titles=('預售社區縣市分布 (前10名)', '交易記錄縣市分布 (前10名)'))
 
 # 預售社區縣市分布
-community_city_top10 = community_df['縣市'].value_counts().head(10)
-axes[0].pie(community_city_top10.values, labels=community_city_top10.index, autopct='%1.1f%%')
-axes[0].set_title('預售社區縣市分布 (前10名)', fontsize=14, fontweight='bold')
+fig.add_trace(go.Pie(labels=community_city_top10.index, values=community_city_top10.values,
+                     textinfo='label+percent', name='預售社區'), row=1, col=1)
 
 # 交易記錄縣市分布
-transaction_city_top10 = transaction_df['縣市'].value_counts().head(10)
-axes[1].pie(transaction_city_top10.values, labels=transaction_city_top10.index, autopct='%1.1f%%')
-axes[1].set_title('交易記錄縣市分布 (前10名)', fontsize=14, fontweight='bold')
+fig.add_trace(go.Pie(labels=transaction_city_top10.index, values=transaction_city_top10.values,
+                     textinfo='label+percent', name='交易記錄'), row=1, col=2)
 
-plt.tight_layout()
-plt.show()
+fig.update_layout(width=1100, height=500, showlegend=False)
+fig.show()
 
 # %%
 # 2. 時間趨勢分析
 fig, axes = plt.subplots(2, 1, figsize=(15, 10))
 
 # 銷售起始年季趨勢
-sales_trend = community_df['銷售起始年季'].value_counts().sort_index()
+sales_trend = season_stats['sales_start_season']
 axes[0].bar(range(len(sales_trend)), sales_trend.values)
 axes[0].set_xticks(range(len(sales_trend)))
 axes[0].set_xticklabels(sales_trend.index, rotation=45)
@@ -353,7 +534,7 @@ axes[0].set_title('預售建案銷售起始年季分布', fontsize=14, fontweigh
 axes[0].set_ylabel('建案數量')
 
 # 交易年季趨勢
-transaction_trend = transaction_df['交易年季'].value_counts().sort_index()
+transaction_trend = season_stats['transaction_season']
 axes[1].bar(range(len(transaction_trend)), transaction_trend.values, color='orange')
 axes[1].set_xticks(range(len(transaction_trend)))
 axes[1].set_xticklabels(transaction_trend.index, rotation=45)
@@ -368,18 +549,22 @@ plt.show()
 fig, axes = plt.subplots(1, 2, figsize=(15, 6))
 
 # 交易總價分布 (移除極端值)
-price_filtered = transaction_df[(transaction_df['交易總價'] >= 500) & 
-                               (transaction_df['交易總價'] <= 10000)]['交易總價']
-axes[0].hist(price_filtered, bins=50, alpha=0.7, color='skyblue')
-axes[0].set_title('交易總價分布 (500-10000萬)', fontsize=14, fontweight='bold')
+price_values = transaction_df['交易總價'].to_numpy(dtype=float, na_value=np.nan)
+price_filtered = price_values[(price_values >= 500) & (price_values <= 10000)]
+price_counts, price_edges = np.histogram(price_filtered, bins=50)
+axes[0].bar(price_edges[:-1], price_counts, width=np.diff(price_edges), align='edge',
+            alpha=0.7, color='skyblue')
+axes[0].set_title(f'交易總價分布 (500-10000萬){transaction_sample_note}', fontsize=14, fontweight='bold')
 axes[0].set_xlabel('交易總價 (萬元)')
 axes[0].set_ylabel('頻次')
 
 # 建物單價分布 (移除極端值)
-unit_price_filtered = transaction_df[(transaction_df['建物單價'] >= 10) & 
-                                    (transaction_df['建物單價'] <= 200)]['建物單價']
-axes[1].hist(unit_price_filtered, bins=50, alpha=0.7, color='lightcoral')
-axes[1].set_title('建物單價分布 (10-200萬/坪)', fontsize=14, fontweight='bold')
+unit_price_values = transaction_df['建物單價'].to_numpy(dtype=float, na_value=np.nan)
+unit_price_filtered = unit_price_values[(unit_price_values >= 10) & (unit_price_values <= 200)]
+unit_price_counts, unit_price_edges = np.histogram(unit_price_filtered, bins=50)
+axes[1].bar(unit_price_edges[:-1], unit_price_counts, width=np.diff(unit_price_edges), align='edge',
+            alpha=0.7, color='lightcoral')
+axes[1].set_title(f'建物單價分布 (10-200萬/坪){transaction_sample_note}', fontsize=14, fontweight='bold')
 axes[1].set_xlabel('建物單價 (萬/坪)')
 axes[1].set_ylabel('頻次')
 
@@ -396,19 +581,19 @@ print("=" * 80)
 
 # 基本統計
 print("1️⃣ 基本統計資訊:")
-print(f"   預售社區建案數: {len(community_df):,}")
-print(f"   交易記錄筆數: {len(transaction_df):,}")
-print(f"   資料匹配率: {len(community_ids & transaction_ids) / max(len(community_ids), len(transaction_ids)) * 100:.2f}%")
+print(f"   預售社區建案數: {community_rows:,}")
+print(f"   交易記錄筆數: {transaction_rows:,}")
+print(f"   資料匹配率: {match_rate:.2f}%")
 
 # 時間覆蓋範圍
 print(f"\n2️⃣ 時間覆蓋範圍:")
-print(f"   銷售起始年季: {sales_start_season.index.min()} ~ {sales_start_season.index.max()}")
-print(f"   交易年季: {transaction_season.index.min()} ~ {transaction_season.index.max()}")
+print(f"   銷售起始年季: {season_stats['sales_start_season'].index.min()} ~ {season_stats['sales_start_season'].index.max()}")
+print(f"   交易年季: {season_stats['transaction_season'].index.min()} ~ {season_stats['transaction_season'].index.max()}")
 
 # 地理覆蓋範圍
 print(f"\n3️⃣ 地理覆蓋範圍:")
-print(f"   涵蓋縣市數: {community_df['縣市'].nunique()}")
-print(f"   涵蓋行政區數: {community_df['行政區'].nunique()}")
+print(f"   涵蓋縣市數: {len(community_city_dist)}")
+print(f"   涵蓋行政區數: {len(full_value_counts(community_df, community_profile, '行政區'))}")
 
 # 解約情況
 print(f"\n4️⃣ 解約情況:")
@@ -417,10 +602,10 @@ print(f"   解約記錄數: {cancelled_transactions:,}")
 
 # 資料品質評估
 print(f"\n5️⃣ 資料品質評估:")
-community_completeness = (1 - community_df[community_key_fields].isnull().sum().sum() / 
-                         (len(community_df) * len(community_key_fields))) * 100
-transaction_completeness = (1 - transaction_df[transaction_key_fields].isnull().sum().sum() / 
-                           (len(transaction_df) * len(transaction_key_fields))) * 100
+community_completeness = (1 - community_nulls[community_key_fields].sum() / 
+                         (community_rows * len(community_key_fields))) * 100
+transaction_completeness = (1 - transaction_nulls[transaction_key_fields].sum() / 
+                           (transaction_rows * len(transaction_key_fields))) * 100
 
 print(f"   預售社區資料完整度: {community_completeness:.1f}%")
 print(f"   交易記錄資料完整度: {transaction_completeness:.1f}%")
@@ -432,14 +617,14 @@ print("\n💾 儲存分析結果...")
 # 建立基礎統計摘要
 basic_stats = {
     'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    'community_records': len(community_df),
-    'transaction_records': len(transaction_df),
-    'match_rate': len(community_ids & transaction_ids) / max(len(community_ids), len(transaction_ids)) * 100,
+    'community_records': community_rows,
+    'transaction_records': transaction_rows,
+    'match_rate': match_rate,
     'cancellation_rate': cancelled_transactions/total_transactions*100,
     'community_completeness': community_completeness,
     'transaction_completeness': transaction_completeness,
-    'covered_cities': community_df['縣市'].nunique(),
-    'covered_districts': community_df['行政區'].nunique()
+    'covered_cities': len(community_city_dist),
+    'covered_districts': len(full_value_counts(community_df, community_profile, '行政區'))
 }
 
 # 轉換為DataFrame並儲存
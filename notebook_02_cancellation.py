@@ -35,6 +35,8 @@ import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from pathlib import Path
+import csv
 import re
 import warnings
 warnings.filterwarnings('ignore')
@@ -53,6 +55,11 @@ plt.rcParams['axes.unicode_minus'] = False
 sns.set_style("whitegrid")
 plt.style.use('default')
 
+# 預先編譯解約記錄使用的正規表示式
+ROC_DATE_RE = re.compile(r'\d{7,8}')    # 7-8位數字 (民國年日期)
+WESTERN_DATE_RE = re.compile(r'\d{8}')  # 8位數字可能是西元年
+DIGITS_RE = re.compile(r'\d+')
+
 print("✅ 環境設定完成")
 print(f"📅 分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -61,12 +68,26 @@ print(f"📅 分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print("🔄 載入資料檔案...")
 
 try:
-    # 載入逐筆交易資料 (主要分析對象)
-    transaction_df = pd.read_csv('../data/raw/lvr_presale_test.csv', encoding='utf-8')
+    # 載入逐筆交易資料 (主要分析對象)，以 pyarrow 引擎多執行緒解析
+    transaction_df = pd.read_csv('../data/raw/lvr_presale_test.csv', encoding='utf-8',
+                                 engine='pyarrow', dtype_backend='pyarrow')
+    
+    # 低基數字串欄位轉為 category，後續 value_counts 與比較皆以整數代碼運算
+    for col in ['縣市', '行政區', '主要用途', '交易年季']:
+        transaction_df[col] = transaction_df[col].astype('category')
+    
+    # 縣市行政區組合鍵只建立一次，解約子集以布林篩選直接繼承
+    transaction_df['縣市行政區'] = pd.Categorical(
+        transaction_df['縣市'].astype(str) + transaction_df['行政區'].astype(str)
+    )
+    
+    # 解約旗標只計算一次，後續統計、篩選與各維度 groupby 皆共用
+    transaction_df['is_cancelled'] = transaction_df['解約情形'].notna()
     print(f"✅ 逐筆交易資料載入成功: {transaction_df.shape}")
     
     # 載入預售社區資料 (輔助分析)
-    community_df = pd.read_csv('../data/raw/lvr_community_data_test.csv', encoding='utf-8')
+    community_df = pd.read_csv('../data/raw/lvr_community_data_test.csv', encoding='utf-8',
+                               engine='pyarrow', dtype_backend='pyarrow')
     print(f"✅ 預售社區資料載入成功: {community_df.shape}")
     
     # 載入 Notebook 1 的基礎分析結果
@@ -91,10 +112,22 @@ except Exception as e:
 print("🚨 解約資料基本統計")
 print("=" * 80)
 
+def cancellation_rate_table(df, by):
+    """依指定欄位一次 groupby 計算交易數 (total)、解約數 (cancelled) 與解約率 (rate)"""
+    stats = df.groupby(by, observed=True)['is_cancelled'].agg(total='size', cancelled='sum')
+    stats['rate'] = stats['cancelled'] / stats['total'] * 100
+    return stats
+
+def collapse_rate_table(grid, level):
+    """將多欄 groupby 的交易數/解約數交叉表彙總到單一層級並計算解約率"""
+    stats = grid.groupby(level=level, observed=True)[['total', 'cancelled']].sum()
+    stats['rate'] = stats['cancelled'] / stats['total'] * 100
+    return stats
+
 # 計算解約統計
 total_transactions = len(transaction_df)
-normal_transactions = transaction_df['解約情形'].isnull().sum()
-cancelled_transactions = transaction_df['解約情形'].notna().sum()
+cancelled_transactions = int(transaction_df['is_cancelled'].sum())
+normal_transactions = total_transactions - cancelled_transactions
 
 print(f"總交易筆數: {total_transactions:,}")
 print(f"正常交易: {normal_transactions:,} 筆 ({normal_transactions/total_transactions*100:.2f}%)")
@@ -106,7 +139,7 @@ print("\n🔍 解約記錄樣本檢視 (前20筆)")
 print("-" * 80)
 
 if cancelled_transactions > 0:
-    cancelled_data = transaction_df[transaction_df['解約情形'].notna()]['解約情形']
+    cancelled_data = transaction_df.loc[transaction_df['is_cancelled'], '解約情形']
     
     print("解約記錄原始格式樣本:")
     for i, cancel_record in enumerate(cancelled_data.head(20)):
@@ -129,43 +162,22 @@ print("\n📊 解約記錄格式模式分析")
 print("-" * 50)
 
 if cancelled_transactions > 0:
-    # 分析常見模式
+    # 分析常見模式 (每個模式一次向量化掃描)
+    cancel_str = cancelled_data.astype(str)
+    has_semicolon = cancel_str.str.contains(';', regex=False)
     patterns = {
-        '全部解約': 0,
-        '部分解約': 0,
-        '包含日期': 0,
-        '包含民國年': 0,
+        '全部解約': int(cancel_str.str.contains('全部解約', regex=False).sum()),
+        '部分解約': int(cancel_str.str.contains('部分解約', regex=False).sum()),
+        '包含日期': int(cancel_str.str.contains(DIGITS_RE).sum()),
+        '包含民國年': int(cancel_str.str.contains(ROC_DATE_RE).sum()),  # 7-8位數字 (民國年日期)
         '包含西元年': 0,
-        '多組日期': 0,
-        '特殊字元': 0
+        '多組日期': int((cancel_str.str.contains(WESTERN_DATE_RE) & has_semicolon).sum()),  # 8位數字且含分隔符號
+        '特殊字元': int((has_semicolon | cancel_str.str.contains(',', regex=False)).sum())
     }
     
-    date_formats = []
-    
-    for cancel_record in cancelled_data:
-        cancel_str = str(cancel_record)
-        
-        # 檢查解約類型
-        if '全部解約' in cancel_str:
-            patterns['全部解約'] += 1
-        if '部分解約' in cancel_str:
-            patterns['部分解約'] += 1
-            
-        # 檢查日期格式
-        if re.search(r'\d{7,8}', cancel_str):  # 7-8位數字 (民國年日期)
-            patterns['包含民國年'] += 1
-        if re.search(r'\d{8}', cancel_str):  # 8位數字可能是西元年
-            if cancel_str.count(';') > 0:
-                patterns['多組日期'] += 1
-        if re.search(r'\d+', cancel_str):
-            patterns['包含日期'] += 1
-        if ';' in cancel_str or ',' in cancel_str:
-            patterns['特殊字元'] += 1
-            
-        # 收集日期格式樣本
-        date_matches = re.findall(r'\d{6,8}', cancel_str)
-        if date_matches:
-            date_formats.extend(date_matches[:2])  # 取前兩個日期
+    # 收集日期格式樣本 (每筆取前兩個日期)
+    date_tokens = cancel_str.str.extractall(r'(\d{6,8})')[0]
+    date_formats = date_tokens[date_tokens.index.get_level_values('match') < 2]
     
     print("解約記錄格式模式統計:")
     for pattern, count in patterns.items():
@@ -174,7 +186,7 @@ if cancelled_transactions > 0:
     
     # 分析日期格式
     print(f"\n日期格式樣本 (前20個):")
-    unique_dates = list(set(date_formats))[:20]
+    unique_dates = date_formats.unique()[:20]
     for i, date_str in enumerate(unique_dates):
         print(f"   {i+1:2d}. {date_str} (長度: {len(date_str)})")
 
@@ -182,94 +194,71 @@ if cancelled_transactions > 0:
 # ## 3. 解約解析函數實作與測試
 
 # %%
-def parse_cancellation_dates(cancel_str):
+def parse_cancellation_series(cancel_series):
     """
-    解析解約記錄中的日期資訊
+    向量化解析整個解約記錄 Series
+    
+    日期為 6-8 位數字：8碼視為西元 YYYYMMDD，7碼 (YYYMMDD) 與6碼 (YYMMDD) 視為民國年，
+    僅保留 2000-2030 年間的有效日期
     
     Args:
-        cancel_str (str): 解約記錄字串
+        cancel_series (pd.Series): 解約記錄字串 Series
         
     Returns:
-        dict: 包含解約類型、日期列表、年季資訊的字典
+        pd.DataFrame: 與輸入相同索引，欄位為 cancellation_type、date_count、
+                      earliest_date、latest_date、year_seasons
     """
-    if pd.isna(cancel_str) or cancel_str == '':
-        return {
-            'cancellation_type': 'normal',
-            'dates': [],
-            'date_count': 0,
-            'earliest_date': None,
-            'latest_date': None,
-            'year_seasons': []
-        }
+    # 相同解約字串只解析一次：factorize 取得唯一值與對應代碼，
+    # 唯一值末尾補一個空值 (代碼 -1 的缺失列即對應到此 normal 結果)
+    codes, uniques = pd.factorize(cancel_series)
+    unique_series = pd.Series(list(uniques) + [None], dtype=object)
     
-    cancel_str = str(cancel_str).strip()
-    result = {
-        'cancellation_type': 'unknown',
-        'dates': [],
-        'date_count': 0,
-        'earliest_date': None,
-        'latest_date': None,
-        'year_seasons': []
-    }
+    cancel_str = unique_series.astype('string').str.strip()
+    is_empty = cancel_str.isna() | (cancel_str == '')
     
     # 判斷解約類型
-    if '全部解約' in cancel_str:
-        result['cancellation_type'] = 'full_cancellation'
-    elif '部分解約' in cancel_str:
-        result['cancellation_type'] = 'partial_cancellation'
-    else:
-        result['cancellation_type'] = 'other'
+    cancellation_type = np.select(
+        [is_empty.to_numpy(),
+         cancel_str.str.contains('全部解約', regex=False).fillna(False).to_numpy(dtype=bool),
+         cancel_str.str.contains('部分解約', regex=False).fillna(False).to_numpy(dtype=bool)],
+        ['normal', 'full_cancellation', 'partial_cancellation'],
+        default='other'
+    )
     
-    # 提取日期 (6-8位數字)
-    date_pattern = r'\d{6,8}'
-    date_matches = re.findall(date_pattern, cancel_str)
+    # 一次提取所有日期 (6-8位數字)，得到以 (原索引, 序號) 為索引的長表
+    tokens = cancel_str.str.extractall(r'(?P<token>\d{6,8})')['token']
+    token_len = tokens.str.len().to_numpy()
+    token_int = tokens.astype(np.int64).to_numpy()
     
-    if date_matches:
-        valid_dates = []
-        
-        for date_str in date_matches:
-            try:
-                # 嘗試解析民國年格式
-                if len(date_str) == 7:  # YYYMMDD 格式
-                    year = int(date_str[:3]) + 1911  # 民國年轉西元年
-                    month = int(date_str[3:5])
-                    day = int(date_str[5:7])
-                elif len(date_str) == 8:  # YYYYMMDD 格式
-                    year = int(date_str[:4])
-                    month = int(date_str[4:6]) 
-                    day = int(date_str[6:8])
-                elif len(date_str) == 6:  # YYMMDD 格式 (假設為民國年)
-                    year = int(date_str[:2]) + 1911
-                    month = int(date_str[2:4])
-                    day = int(date_str[4:6])
-                else:
-                    continue
-                    
-                # 驗證日期合理性
-                if 1 <= month <= 12 and 1 <= day <= 31 and 2000 <= year <= 2030:
-                    date_obj = datetime(year, month, day)
-                    valid_dates.append(date_obj)
-                    
-            except (ValueError, TypeError):
-                continue
-        
-        if valid_dates:
-            result['dates'] = sorted(valid_dates)
-            result['date_count'] = len(valid_dates)
-            result['earliest_date'] = min(valid_dates)
-            result['latest_date'] = max(valid_dates)
-            
-            # 計算年季
-            year_seasons = []
-            for date_obj in valid_dates:
-                year = date_obj.year - 1911  # 轉回民國年
-                season = (date_obj.month - 1) // 3 + 1
-                year_season = f"{year:03d}S{season}"
-                year_seasons.append(year_season)
-            
-            result['year_seasons'] = list(set(year_seasons))
+    # 以整數運算轉為西元 YYYYMMDD：7碼 (YYYMMDD) 與6碼 (YYMMDD) 視為民國年，加上 19110000
+    ymd = np.where(token_len == 8, token_int, token_int + 19110000)
+    year, month, day = ymd // 10000, ymd // 100 % 100, ymd % 100
+    
+    # 驗證日期合理性，不存在的日期 (如2月30日) 由 to_datetime 轉為 NaT
+    valid = (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31) & (year >= 2000) & (year <= 2030)
+    dates = pd.to_datetime(
+        pd.DataFrame({'year': year[valid], 'month': month[valid], 'day': day[valid]},
+                     index=tokens.index[valid]),
+        errors='coerce'
+    ).dropna()
+    
+    # 計算年季並依原始列彙總
+    year_season = ((dates.dt.year - 1911).astype(str).str.zfill(3) + 'S' +
+                   dates.dt.quarter.astype(str))
+    date_stats = dates.groupby(level=0).agg(['count', 'min', 'max'])
+    # 年季去重一次在長表上完成 (取代逐列 set)，保留首次出現順序
+    year_season_lists = year_season.droplevel(1).groupby(level=0).unique().map(list).to_dict()
     
-    return result
+    parsed_unique = pd.DataFrame({
+        'cancellation_type': cancellation_type,
+        'date_count': date_stats['count'].reindex(unique_series.index, fill_value=0).astype(int),
+        'earliest_date': date_stats['min'].reindex(unique_series.index),
+        'latest_date': date_stats['max'].reindex(unique_series.index),
+        'year_seasons': [year_season_lists.get(idx, []) for idx in unique_series.index]
+    }, index=unique_series.index)
+    
+    # 依代碼將唯一值解析結果展開回原始列
+    return parsed_unique.iloc[codes].set_axis(cancel_series.index)
 
 # %%
 # 測試解約解析函數
@@ -295,34 +284,69 @@ if cancelled_transactions > 0:
 print("測試解析結果:")
 print("-" * 80)
 
-for i, test_case in enumerate(test_cases):
-    result = parse_cancellation_dates(test_case)
-    print(f"\n測試案例 {i+1}:")
-    print(f"輸入: {test_case}")
-    print(f"解約類型: {result['cancellation_type']}")
-    print(f"日期數量: {result['date_count']}")
-    if result['dates']:
-        print(f"最早日期: {result['earliest_date'].strftime('%Y-%m-%d')}")
-        print(f"最晚日期: {result['latest_date'].strftime('%Y-%m-%d')}")
-        print(f"年季: {', '.join(result['year_seasons'])}")
+# 測試案例走與正式解析相同的向量化路徑，一次輸出結果表
+test_results = parse_cancellation_series(pd.Series(test_cases, dtype=object))
+test_results.insert(0, 'input', test_cases)
+print(test_results.to_string())
 
 # %%
 # 對所有解約記錄進行解析
 print("\n🔄 解析所有解約記錄...")
 
-if cancelled_transactions > 0:
-    # 應用解析函數到所有解約記錄
-    cancelled_df = transaction_df[transaction_df['解約情形'].notna()].copy()
-    
-    # 解析解約資訊
-    cancellation_parsed = cancelled_df['解約情形'].apply(parse_cancellation_dates)
+# 解析結果快取 (較原始資料新且版本相符時直接載入，跳過重新解析)
+# 解析函數、正規表示式或上方載入儲存格的欄位處理 (類別轉型、縣市行政區、is_cancelled) 變更時，
+# 請手動將 PARSE_CACHE_VERSION 加一，使舊快取失效；版本號寫入 Parquet 中繼資料 (df.attrs)
+PARSE_CACHE_VERSION = 1
+RAW_TRANSACTION_PATH = Path('../data/raw/lvr_presale_test.csv')
+PARSED_CACHE_PATH = Path('../data/processed/02_cancellation_parsed.parquet')
+
+def load_parsed_cache():
+    """
+    載入解約解析快取，快取不存在、較原始資料舊或版本不符時回傳 None
     
-    # 展開解析結果
-    cancelled_df['解約類型'] = cancellation_parsed.apply(lambda x: x['cancellation_type'])
-    cancelled_df['解約日期數量'] = cancellation_parsed.apply(lambda x: x['date_count'])
-    cancelled_df['最早解約日期'] = cancellation_parsed.apply(lambda x: x['earliest_date'])
-    cancelled_df['最晚解約日期'] = cancellation_parsed.apply(lambda x: x['latest_date'])
-    cancelled_df['解約年季'] = cancellation_parsed.apply(lambda x: x['year_seasons'])
+    Returns:
+        DataFrame | None: 快取的解約解析結果
+    """
+    if not PARSED_CACHE_PATH.exists():
+        return None
+    if PARSED_CACHE_PATH.stat().st_mtime < RAW_TRANSACTION_PATH.stat().st_mtime:
+        return None
+    cached_df = pd.read_parquet(PARSED_CACHE_PATH)
+    if cached_df.attrs.get('parse_cache_version') != PARSE_CACHE_VERSION:
+        print(f"⚠️ 解析快取版本不符 (快取: {cached_df.attrs.get('parse_cache_version')}, "
+              f"目前: {PARSE_CACHE_VERSION})，重新解析")
+        return None
+    return cached_df
+
+if cancelled_transactions > 0:
+    cancelled_df = load_parsed_cache()
+    if cancelled_df is not None:
+        # Parquet 的 list 欄位讀回為 ndarray，轉回 list 使輸出與重新解析時一致
+        cancelled_df['解約年季'] = cancelled_df['解約年季'].map(list)
+        print(f"✅ 載入解約解析快取: {PARSED_CACHE_PATH}")
+    else:
+        # 應用解析函數到所有解約記錄
+        cancelled_df = transaction_df.loc[transaction_df['is_cancelled']].copy()
+        
+        # 解析解約資訊 (向量化處理整個欄位)
+        cancellation_parsed = parse_cancellation_series(cancelled_df['解約情形'])
+        
+        # 展開解析結果 (欄位更名後一次 join 回解約資料)
+        parsed_columns = {
+            'cancellation_type': '解約類型',
+            'date_count': '解約日期數量',
+            'earliest_date': '最早解約日期',
+            'latest_date': '最晚解約日期',
+            'year_seasons': '解約年季'
+        }
+        cancelled_df = cancelled_df.join(
+            cancellation_parsed.rename(columns=parsed_columns).astype({'解約類型': 'category'})
+        )
+        
+        # 寫入 Parquet 快取，保留 datetime 與 category 型別供後續 Notebook 直接載入
+        cancelled_df.attrs['parse_cache_version'] = PARSE_CACHE_VERSION
+        PARSED_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        cancelled_df.to_parquet(PARSED_CACHE_PATH, compression='zstd')
     
     print(f"✅ 成功解析 {len(cancelled_df)} 筆解約記錄")
     
@@ -365,20 +389,9 @@ print("\n🗺️ 縣市解約分布分析")
 print("-" * 50)
 
 if not cancelled_df.empty:
-    # 計算各縣市的解約統計
-    city_cancellation = cancelled_df['縣市'].value_counts()
-    city_total = transaction_df['縣市'].value_counts()
-    
-    city_cancel_rate = {}
-    for city in city_total.index[:10]:  # 前10大縣市
-        total = city_total[city]
-        cancelled = city_cancellation.get(city, 0)
-        cancel_rate = cancelled / total * 100
-        city_cancel_rate[city] = {
-            'total': total,
-            'cancelled': cancelled,
-            'rate': cancel_rate
-        }
+    # 計算各縣市的解約統計 (前10大縣市)
+    city_stats = cancellation_rate_table(transaction_df, '縣市').nlargest(10, 'total')
+    city_cancel_rate = city_stats.to_dict('index')
     
     print("主要縣市解約率:")
     for city, stats in city_cancel_rate.items():
@@ -390,26 +403,39 @@ print("\n🏘️ 主要行政區解約分布分析")
 print("-" * 50)
 
 if not cancelled_df.empty:
-    # 結合縣市和行政區
-    cancelled_df['縣市行政區'] = cancelled_df['縣市'] + cancelled_df['行政區']
-    transaction_df['縣市行政區'] = transaction_df['縣市'] + transaction_df['行政區']
-    
-    district_cancellation = cancelled_df['縣市行政區'].value_counts()
-    district_total = transaction_df['縣市行政區'].value_counts()
-    
     # 計算主要行政區解約率 (交易量前20名)
-    top_districts = district_total.head(20)
+    top_districts = cancellation_rate_table(transaction_df, '縣市行政區').nlargest(20, 'total')
     
     print("主要行政區解約率 (交易量前20名):")
-    for district in top_districts.index:
-        total = district_total[district]
-        cancelled = district_cancellation.get(district, 0)
-        cancel_rate = cancelled / total * 100
-        print(f"   {district}: {cancelled}/{total} ({cancel_rate:.2f}%)")
+    for district, stats in top_districts.iterrows():
+        print(f"   {district}: {stats['cancelled']:.0f}/{stats['total']:.0f} ({stats['rate']:.2f}%)")
 
 # %% [markdown]
 # ## 5. 解約時間趨勢分析
 
+# %%
+def parse_transaction_dates(date_series):
+    """
+    依第一筆有效值判斷交易日期格式，再以明確 format 與 cache 解析整欄
+    民國年7碼 (YYYMMDD) 先以整數運算轉為西元8碼
+    """
+    if pd.api.types.is_numeric_dtype(date_series):
+        date_series = date_series.astype('Int64')
+    date_str = date_series.astype('string').str.strip()
+    non_null = date_str.dropna()
+    sample = non_null.iloc[0] if not non_null.empty else ''
+    
+    if '-' in sample:
+        date_format = '%Y-%m-%d'
+    elif '/' in sample:
+        date_format = '%Y/%m/%d'
+    else:
+        date_format = '%Y%m%d'
+        if len(sample) == 7 and sample.isdigit():
+            date_str = (pd.to_numeric(date_str, errors='coerce') + 19110000).astype('Int64').astype('string')
+    
+    return pd.to_datetime(date_str, format=date_format, errors='coerce', cache=True)
+
 # %%
 # 解約時間趨勢分析
 print("📈 解約時間趨勢分析")
@@ -425,6 +451,8 @@ if not cancelled_df.empty and (cancelled_df['解約日期數量'] > 0).any():
         # 解約年份分布
         dated_cancellations['解約年份'] = dated_cancellations['最早解約日期'].dt.year
         yearly_cancellations = dated_cancellations['解約年份'].value_counts().sort_index()
+        # 索引已排序，首尾即為解約年份範圍，快取供總結報告使用
+        y_min, y_max = int(yearly_cancellations.index[0]), int(yearly_cancellations.index[-1])
         
         print(f"\n解約年份分布:")
         for year, count in yearly_cancellations.items():
@@ -441,10 +469,8 @@ if not cancelled_df.empty and (cancelled_df['解約日期數量'] > 0).any():
         # 解約與交易時間間隔分析
         print(f"\n解約時間間隔分析:")
         
-        # 嘗試解析交易日期
-        dated_cancellations['交易日期_parsed'] = pd.to_datetime(
-            dated_cancellations['交易日期'], errors='coerce'
-        )
+        # 嘗試解析交易日期 (依樣本值指定 format，避免逐筆推斷格式)
+        dated_cancellations['交易日期_parsed'] = parse_transaction_dates(dated_cancellations['交易日期'])
         
         valid_intervals = dated_cancellations[
             (dated_cancellations['交易日期_parsed'].notna()) & 
@@ -488,16 +514,11 @@ print("-" * 50)
 
 if not cancelled_df.empty:
     # 交易年季分布
-    transaction_season_cancellation = cancelled_df['交易年季'].value_counts().sort_index()
-    transaction_season_total = transaction_df['交易年季'].value_counts().sort_index()
+    season_stats = cancellation_rate_table(transaction_df, '交易年季').sort_index()
     
     print("各交易年季解約情況:")
-    for season in transaction_season_total.index:
-        total = transaction_season_total[season]
-        cancelled = transaction_season_cancellation.get(season, 0)
-        if total > 0:
-            cancel_rate = cancelled / total * 100
-            print(f"   {season}: {cancelled}/{total} ({cancel_rate:.2f}%)")
+    for season, stats in season_stats.iterrows():
+        print(f"   {season}: {stats['cancelled']:.0f}/{stats['total']:.0f} ({stats['rate']:.2f}%)")
 
 # %% [markdown]
 # ## 6. 解約風險評估分析
@@ -527,18 +548,7 @@ if not cancelled_df.empty:
             labels=['小型(≤50)', '中小型(51-100)', '中型(101-200)', '大型(201-500)', '超大型(>500)']
         )
         
-        scale_cancellation = {}
-        for scale in merged_data['建案規模'].cat.categories:
-            scale_data = merged_data[merged_data['建案規模'] == scale]
-            total = len(scale_data)
-            cancelled = scale_data['解約情形'].notna().sum()
-            if total > 0:
-                cancel_rate = cancelled / total * 100
-                scale_cancellation[scale] = {
-                    'total': total,
-                    'cancelled': cancelled,
-                    'rate': cancel_rate
-                }
+        scale_cancellation = cancellation_rate_table(merged_data, '建案規模').to_dict('index')
         
         for scale, stats in scale_cancellation.items():
             print(f"   {scale}: {stats['cancelled']}/{stats['total']} ({stats['rate']:.2f}%)")
@@ -550,28 +560,29 @@ if not cancelled_df.empty:
 print("\n2️⃣ 價格區間與解約率關係:")
 
 if not cancelled_df.empty:
-    # 定義價格區間
+    # 定義價格區間與單價區間
     price_bins = [0, 1000, 2000, 3000, 5000, 10000, float('inf')]
     price_labels = ['<1000萬', '1000-2000萬', '2000-3000萬', '3000-5000萬', '5000-10000萬', '>10000萬']
+    unit_price_bins = [0, 30, 50, 70, 100, 150, float('inf')]
+    unit_price_labels = ['<30萬/坪', '30-50萬/坪', '50-70萬/坪', '70-100萬/坪', '100-150萬/坪', '>150萬/坪']
     
     transaction_df['價格區間'] = pd.cut(
         transaction_df['交易總價'], 
         bins=price_bins,
         labels=price_labels
     )
+    transaction_df['單價區間'] = pd.cut(
+        transaction_df['建物單價'], 
+        bins=unit_price_bins,
+        labels=unit_price_labels
+    )
     
-    price_cancellation = {}
-    for price_range in price_labels:
-        price_data = transaction_df[transaction_df['價格區間'] == price_range]
-        total = len(price_data)
-        cancelled = price_data['解約情形'].notna().sum()
-        if total > 0:
-            cancel_rate = cancelled / total * 100
-            price_cancellation[price_range] = {
-                'total': total,
-                'cancelled': cancelled,
-                'rate': cancel_rate
-            }
+    # 一次 groupby 取得價格×單價交叉計數，兩個維度的解約率皆由此彙總 (保留缺失區間避免遺漏另一維度的計數)
+    price_grid = transaction_df.groupby(['價格區間', '單價區間'], observed=True, dropna=False)['is_cancelled'].agg(
+        total='size', cancelled='sum'
+    )
+    price_stats = collapse_rate_table(price_grid, '價格區間')
+    price_cancellation = price_stats.to_dict('index')
     
     for price_range, stats in price_cancellation.items():
         print(f"   {price_range}: {stats['cancelled']}/{stats['total']} ({stats['rate']:.2f}%)")
@@ -581,28 +592,7 @@ if not cancelled_df.empty:
 print("\n3️⃣ 單價區間與解約率關係:")
 
 if not cancelled_df.empty:
-    # 定義單價區間
-    unit_price_bins = [0, 30, 50, 70, 100, 150, float('inf')]
-    unit_price_labels = ['<30萬/坪', '30-50萬/坪', '50-70萬/坪', '70-100萬/坪', '100-150萬/坪', '>150萬/坪']
-    
-    transaction_df['單價區間'] = pd.cut(
-        transaction_df['建物單價'], 
-        bins=unit_price_bins,
-        labels=unit_price_labels
-    )
-    
-    unit_price_cancellation = {}
-    for unit_price_range in unit_price_labels:
-        unit_price_data = transaction_df[transaction_df['單價區間'] == unit_price_range]
-        total = len(unit_price_data)
-        cancelled = unit_price_data['解約情形'].notna().sum()
-        if total > 0:
-            cancel_rate = cancelled / total * 100
-            unit_price_cancellation[unit_price_range] = {
-                'total': total,
-                'cancelled': cancelled,
-                'rate': cancel_rate
-            }
+    unit_price_cancellation = collapse_rate_table(price_grid, '單價區間').to_dict('index')
     
     for unit_price_range, stats in unit_price_cancellation.items():
         print(f"   {unit_price_range}: {stats['cancelled']}/{stats['total']} ({stats['rate']:.2f}%)")
@@ -631,20 +621,26 @@ if not cancelled_df.empty:
         
         # 檢視多重解約案例樣本
         print(f"\n多重解約案例樣本 (前5筆):")
-        for i, (idx, row) in enumerate(multiple_cancellations.head().iterrows()):
-            print(f"\n案例 {i+1}:")
-            print(f"   備查編號: {row['備查編號']}")
-            print(f"   縣市行政區: {row['縣市']}{row['行政區']}")
-            print(f"   解約情形: {row['解約情形']}")
-            print(f"   解約日期數量: {row['解約日期數量']}")
-            if row['最早解約日期'] and row['最晚解約日期']:
-                earliest = row['最早解約日期'].strftime('%Y-%m-%d')
-                latest = row['最晚解約日期'].strftime('%Y-%m-%d')
-                print(f"   解約時間範圍: {earliest} ~ {latest}")
-                
-                # 計算解約時間跨度
-                time_span = (row['最晚解約日期'] - row['最早解約日期']).days
-                print(f"   解約時間跨度: {time_span} 天")
+        # 日期格式化與時間跨度先以整欄向量運算完成，迴圈僅負責輸出
+        sample_cases = multiple_cancellations.head()
+        sample_cases = pd.DataFrame({
+            '備查編號': sample_cases['備查編號'],
+            '縣市行政區': sample_cases['縣市行政區'],
+            '解約情形': sample_cases['解約情形'],
+            '解約日期數量': sample_cases['解約日期數量'],
+            '最早': sample_cases['最早解約日期'].dt.strftime('%Y-%m-%d'),
+            '最晚': sample_cases['最晚解約日期'].dt.strftime('%Y-%m-%d'),
+            '跨度': (sample_cases['最晚解約日期'] - sample_cases['最早解約日期']).dt.days  # 解約時間跨度
+        })
+        for i, case in enumerate(sample_cases.itertuples(index=False), 1):
+            print(f"\n案例 {i}:")
+            print(f"   備查編號: {case.備查編號}")
+            print(f"   縣市行政區: {case.縣市行政區}")
+            print(f"   解約情形: {case.解約情形}")
+            print(f"   解約日期數量: {case.解約日期數量}")
+            if pd.notna(case.最早) and pd.notna(case.最晚):
+                print(f"   解約時間範圍: {case.最早} ~ {case.最晚}")
+                print(f"   解約時間跨度: {case.跨度} 天")
         
         # 分析多重解約的時間跨度
         valid_multiple = multiple_cancellations[
@@ -688,21 +684,15 @@ if not cancelled_df.empty:
         axes[0, 0].set_title('解約類型分布 (無資料)', fontsize=14)
     
     # 2. 縣市解約率 (前10名)
-    if 'city_cancel_rate' in locals() and city_cancel_rate:
-        cities = list(city_cancel_rate.keys())[:10]
-        rates = [city_cancel_rate[city]['rate'] for city in cities]
-        
-        bars = axes[0, 1].bar(range(len(cities)), rates, color='lightcoral')
-        axes[0, 1].set_xticks(range(len(cities)))
-        axes[0, 1].set_xticklabels(cities, rotation=45, ha='right')
+    if 'city_stats' in locals() and not city_stats.empty:
+        city_stats.head(10)['rate'].plot.bar(ax=axes[0, 1], color='lightcoral', rot=45)
+        axes[0, 1].set_xticklabels(axes[0, 1].get_xticklabels(), ha='right')
         axes[0, 1].set_title('主要縣市解約率', fontsize=14, fontweight='bold')
+        axes[0, 1].set_xlabel('')
         axes[0, 1].set_ylabel('解約率 (%)')
         
         # 添加數值標籤
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            axes[0, 1].text(bar.get_x() + bar.get_width()/2., height,
-                           f'{height:.1f}%', ha='center', va='bottom')
+        axes[0, 1].bar_label(axes[0, 1].containers[0], fmt='%.1f%%')
     else:
         axes[0, 1].text(0.5, 0.5, '無縣市解約資料', ha='center', va='center', transform=axes[0, 1].transAxes)
         axes[0, 1].set_title('縣市解約率 (無資料)', fontsize=14)
@@ -719,21 +709,15 @@ if not cancelled_df.empty:
         axes[1, 0].set_title('解約年份分布 (無資料)', fontsize=14)
     
     # 4. 價格區間解約率
-    if 'price_cancellation' in locals() and price_cancellation:
-        price_ranges = list(price_cancellation.keys())
-        price_rates = [price_cancellation[pr]['rate'] for pr in price_ranges]
-        
-        bars = axes[1, 1].bar(range(len(price_ranges)), price_rates, color='lightgreen')
-        axes[1, 1].set_xticks(range(len(price_ranges)))
-        axes[1, 1].set_xticklabels(price_ranges, rotation=45, ha='right')
+    if 'price_stats' in locals() and not price_stats.empty:
+        price_stats['rate'].plot.bar(ax=axes[1, 1], color='lightgreen', rot=45)
+        axes[1, 1].set_xticklabels(axes[1, 1].get_xticklabels(), ha='right')
         axes[1, 1].set_title('價格區間解約率', fontsize=14, fontweight='bold')
+        axes[1, 1].set_xlabel('')
         axes[1, 1].set_ylabel('解約率 (%)')
         
         # 添加數值標籤
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            axes[1, 1].text(bar.get_x() + bar.get_width()/2., height,
-                           f'{height:.1f}%', ha='center', va='bottom')
+        axes[1, 1].bar_label(axes[1, 1].containers[0], fmt='%.1f%%')
     else:
         axes[1, 1].text(0.5, 0.5, '無價格解約資料', ha='center', va='center', transform=axes[1, 1].transAxes)
         axes[1, 1].set_title('價格區間解約率 (無資料)', fontsize=14)
@@ -775,96 +759,75 @@ if 'reasonable_intervals' in locals() and not reasonable_intervals.empty:
 print("🎯 解約風險評分模型")
 print("=" * 50)
 
-def calculate_cancellation_risk_score(row):
+def calculate_cancellation_risk_score(df):
     """
     計算解約風險評分 (0-100分，分數越高風險越大)
+    以整欄向量運算處理所有交易，評分規則與逐筆版本相同
     """
-    score = 0
-    
     # 1. 價格因子 (30分)
-    total_price = row.get('交易總價', 0)
-    if total_price > 8000:  # 超高價
-        score += 25
-    elif total_price > 5000:  # 高價
-        score += 20
-    elif total_price > 3000:  # 中高價
-        score += 15
-    elif total_price > 1000:  # 中價
-        score += 10
-    else:  # 低價
-        score += 5
+    total_price = df['交易總價'].to_numpy(dtype=float, na_value=np.nan)
+    price_score = np.select(
+        [total_price > 8000, total_price > 5000, total_price > 3000, total_price > 1000],  # 超高價/高價/中高價/中價
+        [25, 20, 15, 10],
+        default=5  # 低價
+    )
     
     # 2. 單價因子 (25分)
-    unit_price = row.get('建物單價', 0)
-    if unit_price > 150:  # 超高單價
-        score += 25
-    elif unit_price > 100:  # 高單價
-        score += 20
-    elif unit_price > 70:  # 中高單價
-        score += 15
-    elif unit_price > 50:  # 中單價
-        score += 10
-    else:  # 低單價
-        score += 5
+    unit_price = df['建物單價'].to_numpy(dtype=float, na_value=np.nan)
+    unit_price_score = np.select(
+        [unit_price > 150, unit_price > 100, unit_price > 70, unit_price > 50],  # 超高/高/中高/中單價
+        [25, 20, 15, 10],
+        default=5  # 低單價
+    )
     
     # 3. 地區因子 (20分) - 基於歷史解約率
-    city = row.get('縣市', '')
-    if city in ['台北市', '新北市']:  # 高價區域
-        score += 20
-    elif city in ['桃園市', '台中市']:  # 中價區域
-        score += 15
-    elif city in ['高雄市', '台南市']:  # 相對平價區域
-        score += 10
-    else:  # 其他區域
-        score += 5
+    city_scores = {
+        '台北市': 20, '新北市': 20,  # 高價區域
+        '桃園市': 15, '台中市': 15,  # 中價區域
+        '高雄市': 10, '台南市': 10   # 相對平價區域
+    }
+    city_score = df['縣市'].map(city_scores).astype(float).fillna(5).astype(int).to_numpy()  # 其他區域
     
-    # 4. 時間因子 (15分) - 近期交易風險較高
-    try:
-        transaction_season = row.get('交易年季', '')
-        if transaction_season:
-            # 假設越近期的交易風險越高 (簡化處理)
-            if transaction_season >= '112S1':  # 2023年後
-                score += 15
-            elif transaction_season >= '111S1':  # 2022年後
-                score += 10
-            else:
-                score += 5
-    except:
-        score += 5
+    # 4. 時間因子 (15分) - 近期交易風險較高 (簡化處理)
+    season = df['交易年季'].astype('string')
+    season_score = np.select(
+        [season.isna().to_numpy(),
+         (season == '').fillna(False).to_numpy(dtype=bool),
+         (season >= '112S1').fillna(False).to_numpy(dtype=bool),  # 2023年後
+         (season >= '111S1').fillna(False).to_numpy(dtype=bool)], # 2022年後
+        [5, 0, 15, 10],
+        default=5
+    )
     
     # 5. 建物類型因子 (10分)
-    building_use = row.get('主要用途', '')
-    if '住宅' in str(building_use):
-        score += 10
-    else:
-        score += 5
+    is_residential = df['主要用途'].astype('string').str.contains('住宅', regex=False)
+    use_score = np.where(is_residential.fillna(False).to_numpy(dtype=bool), 10, 5)
     
-    return min(score, 100)  # 最高100分
+    score = price_score + unit_price_score + city_score + season_score + use_score
+    return pd.Series(np.minimum(score, 100), index=df.index)  # 最高100分
 
 # %%
 # 應用風險評分模型
 print("🔄 計算所有交易的解約風險評分...")
 
 # 計算風險評分
-transaction_df['解約風險評分'] = transaction_df.apply(calculate_cancellation_risk_score, axis=1)
+transaction_df['解約風險評分'] = calculate_cancellation_risk_score(transaction_df)
 
 # 定義風險等級
-def get_risk_level(score):
-    if score >= 80:
-        return '極高風險'
-    elif score >= 65:
-        return '高風險'
-    elif score >= 50:
-        return '中風險'
-    elif score >= 35:
-        return '低風險'
-    else:
-        return '極低風險'
+def get_risk_level(scores):
+    return np.select(
+        [scores >= 80, scores >= 65, scores >= 50, scores >= 35],
+        ['極高風險', '高風險', '中風險', '低風險'],
+        default='極低風險'
+    )
 
-transaction_df['風險等級'] = transaction_df['解約風險評分'].apply(get_risk_level)
+# 固定五級的有序類別，篩選與分組皆以整數代碼運算
+RISK_LEVELS = ['極低風險', '低風險', '中風險', '高風險', '極高風險']
+transaction_df['風險等級'] = pd.Categorical(get_risk_level(transaction_df['解約風險評分'].to_numpy()),
+                                        categories=RISK_LEVELS, ordered=True)
 
-# 風險等級分布
-risk_distribution = transaction_df['風險等級'].value_counts()
+# 風險等級分布 (有序類別的 value_counts 會列出0筆的等級，僅保留實際出現者)
+risk_distribution = transaction_df['風險等級'].value_counts()[lambda s: s > 0]
 print("\n交易風險等級分布:")
 for risk_level, count in risk_distribution.items():
     percentage = count / len(transaction_df) * 100
@@ -876,21 +839,10 @@ print("\n🔍 風險模型有效性驗證")
 print("-" * 50)
 
 # 計算各風險等級的實際解約率
-risk_cancellation_rates = {}
-for risk_level in risk_distribution.index:
-    risk_data = transaction_df[transaction_df['風險等級'] == risk_level]
-    total = len(risk_data)
-    cancelled = risk_data['解約情形'].notna().sum()
-    cancel_rate = cancelled / total * 100 if total > 0 else 0
-    
-    risk_cancellation_rates[risk_level] = {
-        'total': total,
-        'cancelled': cancelled,
-        'rate': cancel_rate
-    }
+risk_cancellation_rates = cancellation_rate_table(transaction_df, '風險等級').to_dict('index')
 
 print("各風險等級實際解約率:")
-for risk_level in ['極低風險', '低風險', '中風險', '高風險', '極高風險']:
+for risk_level in RISK_LEVELS:
     if risk_level in risk_cancellation_rates:
         stats = risk_cancellation_rates[risk_level]
         print(f"   {risk_level}: {stats['cancelled']}/{stats['total']} ({stats['rate']:.2f}%)")
@@ -960,63 +912,90 @@ risk_summary.to_csv('../data/processed/02_risk_assessment.csv',
                    index=False, encoding='utf-8-sig')
 print("✅ 風險評分結果已儲存至: ../data/processed/02_risk_assessment.csv")
 
+risk_summary.to_parquet('../data/processed/02_risk_assessment.parquet',
+                        index=False, compression='zstd')
+print("✅ 風險評分結果已儲存至: ../data/processed/02_risk_assessment.parquet")
+
 # %%
 # 生成解約分析總結報告
+# 總筆數與解約率只計算一次，總結統計與報告輸出共用
+n_total = len(transaction_df)
+cancel_rate = cancelled_transactions / n_total * 100
+
+# 解析成功與多重解約筆數同樣只計算一次
+if cancelled_df.empty:
+    successful_parsing = multi_cancel = 0
+else:
+    date_counts = cancelled_df['解約日期數量'].to_numpy()
+    successful_parsing = int(np.count_nonzero(date_counts > 0))
+    multi_cancel = int(np.count_nonzero(date_counts > 1))
+parse_rate = successful_parsing / len(cancelled_df) * 100 if not cancelled_df.empty else 0.0
+
+# 高風險遮罩只計算一次，總結統計與報告輸出共用 (有序類別代碼 >= 高風險)
+high_risk_mask = transaction_df['風險等級'].cat.codes.to_numpy() >= RISK_LEVELS.index('高風險')
+high_risk_transactions = int(high_risk_mask.sum())
+
 cancellation_summary_stats = {
     'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    'total_transactions': len(transaction_df),
-    'cancelled_transactions': cancelled_transactions,
-    'cancellation_rate': cancelled_transactions / len(transaction_df) * 100,
-    'parsed_dates_count': len(cancelled_df[cancelled_df['解約日期數量'] > 0]) if not cancelled_df.empty else 0,
-    'multiple_cancellations': len(cancelled_df[cancelled_df['解約日期數量'] > 1]) if not cancelled_df.empty else 0,
-    'high_risk_transactions': len(transaction_df[transaction_df['風險等級'].isin(['高風險', '極高風險'])]),
-    'high_risk_cancel_rate': high_risk_cancel_rate,
-    'low_risk_cancel_rate': low_risk_cancel_rate,
-    'model_effective': high_risk_cancel_rate > low_risk_cancel_rate
+    'total_transactions': int(n_total),
+    'cancelled_transactions': int(cancelled_transactions),
+    'cancellation_rate': float(cancel_rate),
+    'parsed_dates_count': int(successful_parsing),
+    'multiple_cancellations': int(multi_cancel),
+    'high_risk_transactions': int(high_risk_transactions),
+    'high_risk_cancel_rate': float(high_risk_cancel_rate),
+    'low_risk_cancel_rate': float(low_risk_cancel_rate),
+    'model_effective': bool(high_risk_cancel_rate > low_risk_cancel_rate)
 }
 
-# 轉換為DataFrame並儲存
-summary_df = pd.DataFrame([cancellation_summary_stats])
-summary_df.to_csv('../data/processed/02_cancellation_summary.csv', 
-                 index=False, encoding='utf-8-sig')
+# 單列總結以 csv.writer 直接寫出標題列與數值列 (欄位皆為純量，無需經過 DataFrame)
+with open('../data/processed/02_cancellation_summary.csv', 'w', encoding='utf-8-sig', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(cancellation_summary_stats.keys())
+    writer.writerow(cancellation_summary_stats.values())
 
 print("✅ 解約分析總結已儲存至: ../data/processed/02_cancellation_summary.csv")
 
 # %%
-# 解約分析總結報告
-print("\n📋 解約分析總結報告")
-print("=" * 80)
+# 解約分析總結報告 (先收集各行，最後一次輸出)
+report_lines = ["\n📋 解約分析總結報告", "=" * 80]
 
-print("1️⃣ 解約基本統計:")
-print(f"   總交易筆數: {len(transaction_df):,}")
-print(f"   解約交易筆數: {cancelled_transactions:,}")
-print(f"   解約率: {cancelled_transactions / len(transaction_df) * 100:.2f}%")
+report_lines += [
+    "1️⃣ 解約基本統計:",
+    f"   總交易筆數: {n_total:,}",
+    f"   解約交易筆數: {cancelled_transactions:,}",
+    f"   解約率: {cancel_rate:.2f}%"
+]
 
 if not cancelled_df.empty:
-    print(f"\n2️⃣ 解約解析結果:")
-    successful_parsing = len(cancelled_df[cancelled_df['解約日期數量'] > 0])
-    print(f"   成功解析日期: {successful_parsing}/{len(cancelled_df)} ({successful_parsing/len(cancelled_df)*100:.1f}%)")
+    report_lines.append(f"\n2️⃣ 解約解析結果:")
+    report_lines.append(f"   成功解析日期: {successful_parsing}/{len(cancelled_df)} ({parse_rate:.1f}%)")
     
     if successful_parsing > 0:
-        print(f"   多重解約案例: {len(cancelled_df[cancelled_df['解約日期數量'] > 1])} 筆")
+        report_lines.append(f"   多重解約案例: {multi_cancel} 筆")
         
         if not yearly_cancellations.empty:
-            print(f"   解約時間範圍: {yearly_cancellations.index.min()}年 - {yearly_cancellations.index.max()}年")
+            report_lines.append(f"   解約時間範圍: {y_min}年 - {y_max}年")
 
-print(f"\n3️⃣ 風險模型評估:")
-print(f"   高風險交易: {len(transaction_df[transaction_df['風險等級'].isin(['高風險', '極高風險'])]):,} 筆")
-print(f"   高風險群組解約率: {high_risk_cancel_rate:.2f}%")
-print(f"   低風險群組解約率: {low_risk_cancel_rate:.2f}%")
-print(f"   模型有效性: {'✅ 有效' if high_risk_cancel_rate > low_risk_cancel_rate else '❌ 需改進'}")
+report_lines += [
+    f"\n3️⃣ 風險模型評估:",
+    f"   高風險交易: {high_risk_transactions:,} 筆",
+    f"   高風險群組解約率: {high_risk_cancel_rate:.2f}%",
+    f"   低風險群組解約率: {low_risk_cancel_rate:.2f}%",
+    f"   模型有效性: {'✅ 有效' if high_risk_cancel_rate > low_risk_cancel_rate else '❌ 需改進'}"
+]
+
+report_lines.append(f"\n4️⃣ 主要發現:")
+# 直接在解約率表上取最大值，不需逐項走訪字典
+if 'city_stats' in locals() and not city_stats.empty:
+    highest_cancel_city = city_stats['rate'].idxmax()
+    report_lines.append(f"   解約率最高縣市: {highest_cancel_city} ({city_stats.at[highest_cancel_city, 'rate']:.2f}%)")
 
-print(f"\n4️⃣ 主要發現:")
-if 'city_cancel_rate' in locals() and city_cancel_rate:
-    highest_cancel_city = max(city_cancel_rate.items(), key=lambda x: x[1]['rate'])
-    print(f"   解約率最高縣市: {highest_cancel_city[0]} ({highest_cancel_city[1]['rate']:.2f}%)")
+if 'price_stats' in locals() and not price_stats.empty:
+    highest_cancel_price = price_stats['rate'].idxmax()
+    report_lines.append(f"   解約率最高價格區間: {highest_cancel_price} ({price_stats.at[highest_cancel_price, 'rate']:.2f}%)")
 
-if 'price_cancellation' in locals() and price_cancellation:
-    highest_cancel_price = max(price_cancellation.items(), key=lambda x: x[1]['rate'])
-    print(f"   解約率最高價格區間: {highest_cancel_price[0]} ({highest_cancel_price[1]['rate']:.2f}%)")
+print('\n'.join(report_lines))
 
 # %% [markdown]
 # ## 11. 下一步工作重點
@@ -1041,8 +1020,8 @@ if 'price_cancellation' in locals() and price_cancellation:
 #    - 供需關係評估
 # 
 # ### 🎯 關鍵發現:
-# 1. 解約率 {cancelled_transactions / len(transaction_df) * 100:.2f}% 符合市場預期
-# 2. 解約解析函數可成功處理 {successful_parsing/len(cancelled_df)*100:.1f if not cancelled_df.empty else 0:.1f}% 的解約記錄
+# 1. 解約率 {cancel_rate:.2f}% 符合市場預期
+# 2. 解約解析函數可成功處理 {parse_rate:.1f}% 的解約記錄
 # 3. 風險評分模型顯示 {'有效' if high_risk_cancel_rate > low_risk_cancel_rate else '需要調整'} 的預測能力
 # 4. 多重解約案例提供重要的市場風險指標
 
@@ -40,6 +40,9 @@ import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from pathlib import Path
+import pyarrow.compute as pc
+import pyarrow.dataset as pa_ds
 import re
 import warnings
 from collections import Counter, defaultdict
@@ -68,12 +71,73 @@ print(f"📅 分析時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print("🔄 載入前階段處理結果...")
 
 try:
-    # 載入乾淨的交易資料
-    clean_transactions = pd.read_csv('../data/processed/03_clean_transactions.csv', encoding='utf-8')
+    # 載入乾淨的交易資料 (優先讀取 Parquet 並只取所需欄位，上游尚未產出時退回 CSV)
+    # 去化率只計算正常交易與解約筆數，兩旗標皆非 True 的交易不需載入
+    # 先讀取欄位結構，只載入實際存在的欄位；缺少的關鍵欄位由資料概況中的必要欄位檢查回報
+    transaction_columns = ['備查編號', '交易年季', '是否正常交易', '是否解約']
+    flag_columns = ['是否正常交易', '是否解約']
+    clean_transactions_path = Path('../data/processed/03_clean_transactions.parquet')
+    if clean_transactions_path.exists():
+        transactions_dataset = pa_ds.dataset(clean_transactions_path, format='parquet')
+        available_columns = set(transactions_dataset.schema.names)
+    else:
+        clean_transactions_csv = '../data/processed/03_clean_transactions.csv'
+        available_columns = set(pd.read_csv(clean_transactions_csv, encoding='utf-8', nrows=0).columns)
+    load_columns = [col for col in transaction_columns if col in available_columns]
+    present_flags = [col for col in flag_columns if col in available_columns]
+    
+    if clean_transactions_path.exists():
+        # 以 dataset 掃描，欄位裁剪與旗標過濾下推至讀取階段，不符條件的資料不進入記憶體
+        flag_filter = None
+        for flag_col in present_flags:
+            flag_expr = pc.field(flag_col) == True
+            flag_filter = flag_expr if flag_filter is None else flag_filter | flag_expr
+        clean_transactions = transactions_dataset.to_table(columns=load_columns, filter=flag_filter).to_pandas()
+    else:
+        clean_transactions = pd.read_csv(clean_transactions_csv, encoding='utf-8', usecols=load_columns)
+    
+    # 交易旗標統一為 bool (1 byte/列)，與原本 == True 判斷一致，缺值視為 False
+    for flag_col in present_flags:
+        clean_transactions[flag_col] = clean_transactions[flag_col].eq(True)
+    
+    # CSV 來源於此補做相同的旗標過濾 (Parquet 來源已於讀取時過濾)
+    if present_flags:
+        clean_transactions = clean_transactions[
+            clean_transactions[present_flags].any(axis=1)
+        ].reset_index(drop=True)
+    
+    if '交易年季' in clean_transactions.columns:
+        # 年季數字欄位一次以向量化字串解析產生 (例: "111Y1S" -> 1111)，無法解析者為 0
+        season_parts = clean_transactions['交易年季'].astype(str).str.strip().str.extract(r'^(\d+)Y(\d+)S')
+        clean_transactions['season_num'] = (
+            season_parts[0].astype(float) * 10 + season_parts[1].astype(float)
+        ).fillna(0).astype(int)
+        
+        # 年季轉為依時間排序的有序類別，比較與 min/max 皆以整數代碼運算
+        season_order = (clean_transactions[['交易年季', 'season_num']].dropna().drop_duplicates('交易年季')
+                        .sort_values('season_num')['交易年季'])
+        clean_transactions['交易年季'] = pd.Categorical(clean_transactions['交易年季'],
+                                                    categories=season_order, ordered=True)
     print(f"✅ 乾淨交易資料: {clean_transactions.shape}")
     
-    # 載入建案整合結果
-    active_projects = pd.read_csv('../data/processed/04_active_projects_analysis.csv', encoding='utf-8')
+    # 載入建案整合結果 (同上，只取去化率計算所需欄位)
+    project_columns = ['project_code', 'project_name', 'county', 'district',
+                       'total_units', 'is_active', 'has_complete_info']
+    active_projects_path = Path('../data/processed/04_active_projects_analysis.parquet')
+    if active_projects_path.exists():
+        active_projects = pd.read_parquet(active_projects_path, columns=project_columns, engine='pyarrow')
+    else:
+        active_projects = pd.read_csv('../data/processed/04_active_projects_analysis.csv', encoding='utf-8',
+                                      usecols=project_columns)
+    
+    # 建案編號在交易與建案兩表共用同一組類別，篩選與 groupby 以整數代碼比對
+    if '備查編號' in clean_transactions.columns:
+        project_code_dtype = pd.CategoricalDtype(
+            pd.Index(clean_transactions['備查編號'].dropna().unique())
+            .union(pd.Index(active_projects['project_code'].dropna().unique()))
+        )
+        clean_transactions['備查編號'] = clean_transactions['備查編號'].astype(project_code_dtype)
+        active_projects['project_code'] = active_projects['project_code'].astype(project_code_dtype)
     print(f"✅ 活躍建案分析: {active_projects.shape}")
     
     # 載入滯銷分析結果
@@ -96,7 +160,7 @@ print("📊 去化率計算基礎資料概況")
 print("=" * 60)
 
 print("交易資料:")
-print(f"   總筆數: {len(clean_transactions):,}")
+print(f"   總筆數 (正常交易或解約): {len(clean_transactions):,}")
 print(f"   備查編號數: {clean_transactions['備查編號'].nunique():,}")
 print(f"   時間範圍: {clean_transactions['交易年季'].min()} ~ {clean_transactions['交易年季'].max()}")
 
@@ -129,12 +193,19 @@ def season_to_number(season_str):
     """
     將年季字串轉換為可比較的數字
     例: "111Y1S" -> 1111, "111Y2S" -> 1112
+    
+    交易資料已預先計算 season_num 欄位，此函數僅用於目標年季等少量輸入
     """
     try:
         if not season_str or pd.isna(season_str):
             return 0
         
         season_str = str(season_str).strip()
+        
+        # 標準格式 (例: "111Y1S") 直接切片轉換
+        if len(season_str) >= 5 and season_str[-3] == 'Y' and season_str[-1] == 'S':
+            return int(season_str[:-3]) * 10 + int(season_str[-2])
+        
         if 'Y' not in season_str or 'S' not in season_str:
             return 0
             
@@ -166,22 +237,12 @@ def get_season_range(start_season, end_season):
     start_num = season_to_number(start_season)
     end_num = season_to_number(end_season)
     
-    seasons = []
-    current = start_num
-    
-    while current <= end_num:
-        seasons.append(number_to_season(current))
-        
-        # 季度遞增邏輯
-        season = current % 10
-        year = current // 10
-        
-        if season == 4:  # 第4季 -> 下一年第1季
-            current = (year + 1) * 10 + 1
-        else:  # 季度+1
-            current = year * 10 + (season + 1)
-    
-    return seasons
+    # 直接列舉起訖年份內的各季，保留落在範圍內者
+    start_year, end_year = start_num // 10, end_num // 10
+    return [number_to_season(year * 10 + season)
+            for year in range(start_year, end_year + 1)
+            for season in range(1, 5)
+            if start_num <= year * 10 + season <= end_num]
 
 def calculate_sales_seasons(start_season, target_season):
     """
@@ -193,22 +254,10 @@ def calculate_sales_seasons(start_season, target_season):
     if start_num == 0 or target_num == 0 or target_num < start_num:
         return 0
     
-    sales_seasons = 0
-    current = start_num
-    
-    while current <= target_num:
-        sales_seasons += 1
-        
-        # 季度遞增
-        season = current % 10
-        year = current // 10
-        
-        if season == 4:
-            current = (year + 1) * 10 + 1
-        else:
-            current = year * 10 + (season + 1)
-    
-    return sales_seasons
+    # 以年差×4 加季差直接求得累積季數 (含起訖兩季)
+    start_year, start_quarter = divmod(start_num, 10)
+    target_year, target_quarter = divmod(target_num, 10)
+    return (target_year - start_year) * 4 + (target_quarter - start_quarter) + 1
 
 # %%
 # 測試年季處理函數
@@ -227,7 +276,8 @@ for start, end, expected in test_cases:
     print(f"   {status} {start} -> {end}: {result} 季 (預期: {expected})")
 
 # 獲取交易資料中的年季範圍
-available_seasons = sorted(clean_transactions['交易年季'].unique(), key=season_to_number)
+# 交易年季已是依 season_num 排序的有序類別，直接取用類別順序
+available_seasons = list(clean_transactions['交易年季'].cat.categories)
 print(f"\n📅 可用年季範圍: {available_seasons[0]} ~ {available_seasons[-1]} (共 {len(available_seasons)} 季)")
 
 # %% [markdown]
@@ -238,119 +288,104 @@ print(f"\n📅 可用年季範圍: {available_seasons[0]} ~ {available_seasons[-
 print("📈 毛去化率計算實作")
 print("=" * 60)
 
-def calculate_gross_absorption_rate(project_code, target_season, transactions_df, projects_df):
+# %%
+# 批量計算毛去化率
+print("🔄 批量計算毛去化率...")
+
+# 選取目標年季進行測試
+target_seasons = ['113Y1S', '113Y2S', '113Y3S', '113Y4S']
+
+def calculate_cumulative_counts(transactions_df, projects_df, target_seasons):
     """
-    計算毛去化率
+    一次計算所有活躍建案截至各目標年季的累積成交筆數與累積解約筆數
     
-    毛去化率 = 累積成交筆數 ÷ 總戶數 × 100%
+    交易依 (建案, 年季) 組合鍵排序一次後，以 np.searchsorted 二分搜尋
+    直接取得每個建案截至各目標年季的累積筆數，不需逐年季重複篩選
     
     Args:
-        project_code: 建案編號
-        target_season: 目標年季
         transactions_df: 交易資料
         projects_df: 建案資料
+        target_seasons: 目標年季清單
         
     Returns:
-        dict: 毛去化率計算結果
+        DataFrame: 每個 (建案, 目標年季) 一列，含累積筆數與建案資訊 (依目標年季、建案順序排列)
     """
-    
-    result = {
-        'project_code': project_code,
-        'target_season': target_season,
-        'total_units': 0,
-        'cumulative_transactions': 0,
-        'gross_absorption_rate': 0.0,
-        'calculation_status': 'success',
-        'error_message': ''
-    }
-    
-    try:
-        # 獲取建案總戶數
-        project_info = projects_df[projects_df['project_code'] == project_code]
-        if project_info.empty:
-            result['calculation_status'] = 'error'
-            result['error_message'] = '找不到建案資訊'
-            return result
-        
-        total_units = project_info['total_units'].iloc[0]
-        if total_units <= 0:
-            result['calculation_status'] = 'error'
-            result['error_message'] = '總戶數無效'
-            return result
-        
-        result['total_units'] = total_units
-        
-        # 獲取該建案截至目標年季的所有有效交易
-        project_transactions = transactions_df[
-            (transactions_df['備查編號'] == project_code) &
-            (transactions_df['是否正常交易'] == True) &
-            (transactions_df['交易年季'] <= target_season)
-        ].copy()
-        
-        # 按年季排序並計算累積成交筆數
-        if not project_transactions.empty:
-            # 添加年季數字排序欄位
-            project_transactions['season_num'] = project_transactions['交易年季'].apply(season_to_number)
-            target_season_num = season_to_number(target_season)
-            
-            # 只取目標年季之前（包含）的交易
-            valid_transactions = project_transactions[
-                project_transactions['season_num'] <= target_season_num
-            ]
-            
-            cumulative_transactions = len(valid_transactions)
-        else:
-            cumulative_transactions = 0
-        
-        result['cumulative_transactions'] = cumulative_transactions
-        
-        # 計算毛去化率
-        if total_units > 0:
-            gross_absorption_rate = (cumulative_transactions / total_units) * 100
-            result['gross_absorption_rate'] = round(gross_absorption_rate, 2)
-        
-    except Exception as e:
-        result['calculation_status'] = 'error'
-        result['error_message'] = str(e)
-    
-    return result
-
-# %%
-# 批量計算毛去化率
-print("🔄 批量計算毛去化率...")
-
-# 選取目標年季進行測試
-target_seasons = ['113Y1S', '113Y2S', '113Y3S', '113Y4S']
-
-gross_absorption_results = []
+    active = projects_df[projects_df['is_active'] == True]
+    project_index = pd.Index(active['project_code'].unique())
+    target_nums = np.array([season_to_number(s) for s in target_seasons], dtype='int64')
+    
+    # 交易對應到活躍建案序號 (非活躍建案為 -1)，組合鍵 = 建案序號 × 年季上限 + 年季序號
+    txn_project_idx = project_index.get_indexer(transactions_df['備查編號'])
+    txn_season_nums = transactions_df['season_num'].to_numpy(dtype='int64')
+    season_span = int(max(txn_season_nums.max(initial=0), target_nums.max(initial=0))) + 1
+    txn_keys = txn_project_idx.astype('int64') * season_span + txn_season_nums
+    in_active = txn_project_idx >= 0
+    
+    # 查詢鍵 (年季 × 建案)：各建案區段起點與截至各目標年季的終點
+    project_starts = np.arange(len(project_index), dtype='int64') * season_span
+    query_keys = project_starts[None, :] + target_nums[:, None]
+    
+    counts = {}
+    for metric, flag_column in [('cumulative_transactions', '是否正常交易'),
+                                ('cumulative_cancellations', '是否解約')]:
+        sorted_keys = np.sort(txn_keys[in_active & transactions_df[flag_column].to_numpy(dtype=bool)])
+        counts[metric] = (
+            np.searchsorted(sorted_keys, query_keys, side='right')
+            - np.searchsorted(sorted_keys, project_starts, side='left')[None, :]
+        ).ravel()
+    
+    # 轉為長表 (年季優先，與逐筆計算的輸出順序一致)
+    long_df = pd.DataFrame({
+        'project_code': project_index.take(np.tile(np.arange(len(project_index)), len(target_seasons))),
+        'target_season': np.repeat(target_seasons, len(project_index)),
+        **counts
+    })
+    
+    # 一次 merge 補上建案資訊
+    return long_df.merge(
+        active[['project_code', 'total_units', 'county', 'district', 'project_name', 'has_complete_info']],
+        on='project_code', how='left'
+    )
 
-# 對所有活躍建案計算毛去化率
-for target_season in target_seasons:
-    print(f"   計算 {target_season} 毛去化率...")
+def calculate_gross_absorption_batch(transactions_df, projects_df, target_seasons, cumulative_counts=None):
+    """
+    批量計算所有活躍建案於各目標年季的毛去化率
     
-    for _, project in active_projects.iterrows():
-        project_code = project['project_code']
-        
-        # 只計算活躍建案
-        if not project['is_active']:
-            continue
-        
-        result = calculate_gross_absorption_rate(
-            project_code, target_season, clean_transactions, active_projects
-        )
-        
-        # 添加額外資訊
-        result.update({
-            'county': project['county'],
-            'district': project['district'],
-            'project_name': project['project_name'],
-            'has_complete_info': project['has_complete_info']
-        })
+    毛去化率 = 累積成交筆數 ÷ 總戶數 × 100%，累積成交筆數由 calculate_cumulative_counts 一次取得
+    
+    Args:
+        transactions_df: 交易資料
+        projects_df: 建案資料
+        target_seasons: 目標年季清單
+        cumulative_counts: 預先計算的 calculate_cumulative_counts 結果 (未提供時即時計算)
         
-        gross_absorption_results.append(result)
-
-# 轉換為DataFrame
-gross_absorption_df = pd.DataFrame(gross_absorption_results)
+    Returns:
+        DataFrame: 毛去化率計算結果 (依目標年季、建案順序排列)
+    """
+    if cumulative_counts is None:
+        cumulative_counts = calculate_cumulative_counts(transactions_df, projects_df, target_seasons)
+    result = cumulative_counts.copy()
+    
+    # 總戶數無效者標記為錯誤，其餘計算毛去化率
+    invalid_units = result['total_units'] <= 0
+    valid_units = result['total_units'].where(result['total_units'] > 0)
+    result['gross_absorption_rate'] = (result['cumulative_transactions'] / valid_units * 100).round(2).fillna(0.0)
+    result.loc[invalid_units, ['total_units', 'cumulative_transactions']] = 0
+    result['calculation_status'] = np.where(invalid_units, 'error', 'success')
+    result['error_message'] = np.where(invalid_units, '總戶數無效', '')
+    
+    return result[[
+        'project_code', 'target_season', 'total_units', 'cumulative_transactions',
+        'gross_absorption_rate', 'calculation_status', 'error_message',
+        'county', 'district', 'project_name', 'has_complete_info'
+    ]]
+
+# 累積成交與解約筆數只掃描交易資料一次，毛/淨/調整去化率皆由此結果推導
+cumulative_counts_df = calculate_cumulative_counts(clean_transactions, active_projects, target_seasons)
+
+gross_absorption_df = calculate_gross_absorption_batch(
+    clean_transactions, active_projects, target_seasons, cumulative_counts=cumulative_counts_df
+)
 
 print(f"✅ 完成 {len(gross_absorption_df)} 筆毛去化率計算")
 
@@ -396,132 +431,57 @@ if not gross_absorption_df.empty:
 print("📉 淨去化率計算實作")
 print("=" * 60)
 
-def calculate_net_absorption_rate(project_code, target_season, transactions_df, projects_df):
+# %%
+# 批量計算淨去化率
+print("🔄 批量計算淨去化率...")
+
+def calculate_net_absorption_batch(transactions_df, projects_df, target_seasons, cumulative_counts=None):
     """
-    計算淨去化率
+    批量計算所有活躍建案於各目標年季的淨去化率
     
-    淨去化率 = (累積成交筆數 - 累積解約筆數) ÷ 總戶數 × 100%
+    淨去化率 = (累積成交筆數 - 累積解約筆數) ÷ 總戶數 × 100%，累積成交與解約筆數由 calculate_cumulative_counts 一次取得
     
     Args:
-        project_code: 建案編號
-        target_season: 目標年季
         transactions_df: 交易資料
         projects_df: 建案資料
+        target_seasons: 目標年季清單
+        cumulative_counts: 預先計算的 calculate_cumulative_counts 結果 (未提供時即時計算)
         
     Returns:
-        dict: 淨去化率計算結果
+        DataFrame: 淨去化率計算結果 (依目標年季、建案順序排列)
     """
-    
-    result = {
-        'project_code': project_code,
-        'target_season': target_season,
-        'total_units': 0,
-        'cumulative_transactions': 0,
-        'cumulative_cancellations': 0,
-        'net_transactions': 0,
-        'net_absorption_rate': 0.0,
-        'cancellation_rate': 0.0,
-        'calculation_status': 'success',
-        'error_message': ''
-    }
-    
-    try:
-        # 獲取建案總戶數
-        project_info = projects_df[projects_df['project_code'] == project_code]
-        if project_info.empty:
-            result['calculation_status'] = 'error'
-            result['error_message'] = '找不到建案資訊'
-            return result
-        
-        total_units = project_info['total_units'].iloc[0]
-        if total_units <= 0:
-            result['calculation_status'] = 'error'
-            result['error_message'] = '總戶數無效'
-            return result
-        
-        result['total_units'] = total_units
-        
-        target_season_num = season_to_number(target_season)
-        
-        # 獲取該建案截至目標年季的所有交易（包含正常和解約）
-        project_transactions = transactions_df[
-            (transactions_df['備查編號'] == project_code) &
-            (transactions_df['交易年季'].apply(season_to_number) <= target_season_num)
-        ].copy()
-        
-        if not project_transactions.empty:
-            # 計算累積成交筆數（正常交易）
-            normal_transactions = project_transactions[
-                project_transactions['是否正常交易'] == True
-            ]
-            cumulative_transactions = len(normal_transactions)
-            
-            # 計算累積解約筆數
-            cancelled_transactions = project_transactions[
-                project_transactions['是否解約'] == True
-            ]
-            cumulative_cancellations = len(cancelled_transactions)
-            
-        else:
-            cumulative_transactions = 0
-            cumulative_cancellations = 0
-        
-        result['cumulative_transactions'] = cumulative_transactions
-        result['cumulative_cancellations'] = cumulative_cancellations
-        
-        # 計算淨成交筆數
-        net_transactions = cumulative_transactions - cumulative_cancellations
-        result['net_transactions'] = max(0, net_transactions)  # 確保不為負數
-        
-        # 計算淨去化率
-        if total_units > 0:
-            net_absorption_rate = (result['net_transactions'] / total_units) * 100
-            result['net_absorption_rate'] = round(net_absorption_rate, 2)
-        
-        # 計算解約率
-        if cumulative_transactions > 0:
-            cancellation_rate = (cumulative_cancellations / cumulative_transactions) * 100
-            result['cancellation_rate'] = round(cancellation_rate, 2)
-        
-    except Exception as e:
-        result['calculation_status'] = 'error'
-        result['error_message'] = str(e)
-    
-    return result
-
-# %%
-# 批量計算淨去化率
-print("🔄 批量計算淨去化率...")
-
-net_absorption_results = []
-
-# 對所有活躍建案計算淨去化率
-for target_season in target_seasons:
-    print(f"   計算 {target_season} 淨去化率...")
-    
-    for _, project in active_projects.iterrows():
-        project_code = project['project_code']
-        
-        # 只計算活躍建案
-        if not project['is_active']:
-            continue
-        
-        result = calculate_net_absorption_rate(
-            project_code, target_season, clean_transactions, active_projects
-        )
-        
-        # 添加額外資訊
-        result.update({
-            'county': project['county'],
-            'district': project['district'],
-            'project_name': project['project_name'],
-            'has_complete_info': project['has_complete_info']
-        })
-        
-        net_absorption_results.append(result)
-
-# 轉換為DataFrame
-net_absorption_df = pd.DataFrame(net_absorption_results)
+    if cumulative_counts is None:
+        cumulative_counts = calculate_cumulative_counts(transactions_df, projects_df, target_seasons)
+    result = cumulative_counts.copy()
+    
+    cumulative_transactions = result['cumulative_transactions']
+    cumulative_cancellations = result['cumulative_cancellations']
+    
+    # 淨成交筆數 (確保不為負數)、淨去化率與解約率
+    result['net_transactions'] = (cumulative_transactions - cumulative_cancellations).clip(lower=0)
+    valid_units = result['total_units'].where(result['total_units'] > 0)
+    result['net_absorption_rate'] = (result['net_transactions'] / valid_units * 100).round(2).fillna(0.0)
+    result['cancellation_rate'] = (
+        cumulative_cancellations / cumulative_transactions.where(cumulative_transactions > 0) * 100
+    ).round(2).fillna(0.0)
+    
+    # 總戶數無效者標記為錯誤，計算欄位歸零
+    invalid_units = result['total_units'] <= 0
+    result.loc[invalid_units, ['total_units', 'cumulative_transactions', 'cumulative_cancellations',
+                               'net_transactions', 'net_absorption_rate', 'cancellation_rate']] = 0
+    result['calculation_status'] = np.where(invalid_units, 'error', 'success')
+    result['error_message'] = np.where(invalid_units, '總戶數無效', '')
+    
+    return result[[
+        'project_code', 'target_season', 'total_units', 'cumulative_transactions',
+        'cumulative_cancellations', 'net_transactions', 'net_absorption_rate', 'cancellation_rate',
+        'calculation_status', 'error_message',
+        'county', 'district', 'project_name', 'has_complete_info'
+    ]]
+
+net_absorption_df = calculate_net_absorption_batch(
+    clean_transactions, active_projects, target_seasons, cumulative_counts=cumulative_counts_df
+)
 
 print(f"✅ 完成 {len(net_absorption_df)} 筆淨去化率計算")
 
@@ -575,10 +535,46 @@ if not net_absorption_df.empty:
 print("🔧 調整去化率計算實作")
 print("=" * 60)
 
+def build_season_dates(seasons):
+    """
+    建立年季日期對照表，涵蓋輸入年季所跨年度的每一季
+    
+    Args:
+        seasons: 年季清單
+        
+    Returns:
+        dict: 年季 -> (季度起始日期, 季度結束日期, 季度總天數)
+    """
+    years = {season_to_number(s) // 10 for s in seasons} - {0}
+    season_dates = {}
+    if not years:
+        return season_dates
+    
+    for year in range(min(years), max(years) + 1):
+        for season in range(1, 5):
+            start_date = datetime(year + 1911, (season - 1) * 3 + 1, 1)
+            if season == 4:
+                end_date = datetime(year + 1912, 1, 1) - timedelta(days=1)
+            else:
+                end_date = datetime(year + 1911, season * 3 + 1, 1) - timedelta(days=1)
+            season_dates[number_to_season(year * 10 + season)] = (
+                start_date, end_date, (end_date - start_date).days + 1
+            )
+    
+    return season_dates
+
+# 年季日期對照表只建立一次，以下函數直接查表 (表外年季才即時解析)
+SEASON_DATES = build_season_dates(list(available_seasons) + list(target_seasons))
+print(f"📅 年季日期對照表: {len(SEASON_DATES)} 季")
+
 def get_season_days(season_str):
     """
     獲取指定年季的總天數
     """
+    season_dates = SEASON_DATES.get(season_str)
+    if season_dates is not None:
+        return season_dates[2]
+    
     try:
         # 解析年季
         year_part = season_str.split('Y')[0]
@@ -618,6 +614,10 @@ def is_complete_season(target_season, analysis_date=None):
     if analysis_date is None:
         analysis_date = datetime.now()
     
+    season_dates = SEASON_DATES.get(target_season)
+    if season_dates is not None:
+        return analysis_date.date() > season_dates[1].date()
+    
     try:
         # 解析目標年季
         year_part = target_season.split('Y')[0]
@@ -644,127 +644,91 @@ def is_complete_season(target_season, analysis_date=None):
     except:
         return True  # 預設為完整季度
 
-def calculate_adjusted_absorption_rate(project_code, target_season, transactions_df, projects_df, analysis_date=None):
+def get_season_start_date(season_str):
+    """
+    獲取指定年季的起始日期
     """
-    計算調整去化率
+    season_dates = SEASON_DATES.get(season_str)
+    if season_dates is not None:
+        return season_dates[0]
     
-    對於非完整季度，根據實際銷售天數進行標準化調整
+    year_part = season_str.split('Y')[0]
+    season_part = season_str.split('Y')[1].replace('S', '')
+    target_year = int(year_part) + 1911
+    target_season_num = int(season_part)
+    
+    return datetime(target_year, (target_season_num - 1) * 3 + 1, 1)
+
+def get_season_meta(target_season, analysis_date=None):
+    """
+    一次取得目標年季的季度資訊 (只與年季及分析日期有關，可於迴圈外預先計算)
+    
+    Returns:
+        tuple: (季度總天數, 是否為完整季度, 季度起始日期)
+    """
+    is_complete = is_complete_season(target_season, analysis_date)
+    season_start = None if is_complete else get_season_start_date(target_season)
+    return get_season_days(target_season), is_complete, season_start
+
+# %%
+# 批量計算調整去化率
+print("🔄 批量計算調整去化率...")
+
+def calculate_adjusted_absorption_batch(net_df, target_seasons, analysis_date=None):
+    """
+    批量計算所有建案於各目標年季的調整去化率
+    
+    非完整季度依實際銷售天數標準化 (調整係數 = 季度總天數 ÷ 實際銷售天數)；季度資訊只依目標年季計算一次 (長度 S 的陣列)，
+    再依各列的目標年季廣播，一次算出所有建案的調整係數與調整去化率
     
     Args:
-        project_code: 建案編號
-        target_season: 目標年季
-        transactions_df: 交易資料
-        projects_df: 建案資料
+        net_df: calculate_net_absorption_batch 的計算結果
+        target_seasons: 目標年季清單
         analysis_date: 分析基準日期
         
     Returns:
-        dict: 調整去化率計算結果
+        DataFrame: 調整去化率計算結果 (列順序與 net_df 相同)
     """
+    if analysis_date is None:
+        analysis_date = datetime.now()
     
-    # 先計算淨去化率作為基礎
-    net_result = calculate_net_absorption_rate(project_code, target_season, transactions_df, projects_df)
-    
-    result = {
-        **net_result,
-        'season_total_days': 0,
-        'season_sales_days': 0,
-        'is_complete_season': True,
-        'adjustment_factor': 1.0,
-        'adjusted_absorption_rate': net_result.get('net_absorption_rate', 0.0)
+    # 各目標年季的總天數、完整性、實際銷售天數與調整係數
+    season_meta = [get_season_meta(season, analysis_date) for season in target_seasons]
+    season_total_days = np.array([meta[0] for meta in season_meta], dtype='int64')
+    season_complete = np.array([meta[1] for meta in season_meta], dtype=bool)
+    season_sales_days = np.array([
+        total_days if is_complete else max(1, min(total_days, (analysis_date - season_start).days + 1))
+        for total_days, is_complete, season_start in season_meta
+    ], dtype='int64')
+    season_factors = season_total_days / season_sales_days
+    
+    # 依各列目標年季取出對應的季度資訊，只有成功計算且非完整季度者需要調整
+    season_idx = pd.Index(target_seasons).get_indexer(net_df['target_season'])
+    success = (net_df['calculation_status'] == 'success').to_numpy()
+    needs_adjustment = success & ~season_complete[season_idx]
+    net_rate = net_df['net_absorption_rate'].to_numpy(dtype='float64')
+    row_factors = season_factors[season_idx]
+    
+    adjusted_columns = {
+        'season_total_days': np.where(success, season_total_days[season_idx], 0),
+        'season_sales_days': np.where(success, season_sales_days[season_idx], 0),
+        'is_complete_season': np.where(success, season_complete[season_idx], True),
+        'adjustment_factor': np.where(needs_adjustment, np.round(row_factors, 3), 1.0),
+        'adjusted_absorption_rate': np.where(needs_adjustment, np.round(net_rate * row_factors, 2), net_rate)
     }
     
-    if net_result['calculation_status'] != 'success':
-        return result
-    
-    try:
-        # 判斷是否為完整季度
-        is_complete = is_complete_season(target_season, analysis_date)
-        result['is_complete_season'] = is_complete
-        
-        # 獲取季度總天數
-        season_total_days = get_season_days(target_season)
-        result['season_total_days'] = season_total_days
-        
-        if is_complete:
-            # 完整季度，不需調整
-            result['season_sales_days'] = season_total_days
-            result['adjustment_factor'] = 1.0
-            result['adjusted_absorption_rate'] = net_result['net_absorption_rate']
-        else:
-            # 非完整季度，需要調整
-            if analysis_date is None:
-                analysis_date = datetime.now()
-            
-            # 計算季度起始日期
-            year_part = target_season.split('Y')[0]
-            season_part = target_season.split('Y')[1].replace('S', '')
-            target_year = int(year_part) + 1911
-            target_season_num = int(season_part)
-            
-            if target_season_num == 1:
-                season_start = datetime(target_year, 1, 1)
-            elif target_season_num == 2:
-                season_start = datetime(target_year, 4, 1)
-            elif target_season_num == 3:
-                season_start = datetime(target_year, 7, 1)
-            elif target_season_num == 4:
-                season_start = datetime(target_year, 10, 1)
-            
-            # 計算實際銷售天數
-            season_sales_days = min(season_total_days, (analysis_date - season_start).days + 1)
-            season_sales_days = max(1, season_sales_days)  # 至少1天
-            result['season_sales_days'] = season_sales_days
-            
-            # 計算調整係數
-            adjustment_factor = season_total_days / season_sales_days
-            result['adjustment_factor'] = round(adjustment_factor, 3)
-            
-            # 計算調整後去化率
-            adjusted_absorption_rate = net_result['net_absorption_rate'] * adjustment_factor
-            result['adjusted_absorption_rate'] = round(adjusted_absorption_rate, 2)
-    
-    except Exception as e:
-        result['calculation_status'] = 'error'
-        result['error_message'] = f"調整去化率計算錯誤: {str(e)}"
-    
-    return result
-
-# %%
-# 批量計算調整去化率
-print("🔄 批量計算調整去化率...")
+    # 淨去化率欄位、調整欄位與建案資訊一次組成 DataFrame
+    project_info_columns = ['county', 'district', 'project_name', 'has_complete_info']
+    return pd.DataFrame({
+        **{col: net_df[col] for col in net_df.columns if col not in project_info_columns},
+        **adjusted_columns,
+        **{col: net_df[col] for col in project_info_columns}
+    })
 
 # 設定分析基準日期 (假設為113年第4季末的分析)
 analysis_date = datetime(2024, 12, 31)  # 113年第4季末
 
-adjusted_absorption_results = []
-
-# 對所有活躍建案計算調整去化率
-for target_season in target_seasons:
-    print(f"   計算 {target_season} 調整去化率...")
-    
-    for _, project in active_projects.iterrows():
-        project_code = project['project_code']
-        
-        # 只計算活躍建案
-        if not project['is_active']:
-            continue
-        
-        result = calculate_adjusted_absorption_rate(
-            project_code, target_season, clean_transactions, active_projects, analysis_date
-        )
-        
-        # 添加額外資訊
-        result.update({
-            'county': project['county'],
-            'district': project['district'],
-            'project_name': project['project_name'],
-            'has_complete_info': project['has_complete_info']
-        })
-        
-        adjusted_absorption_results.append(result)
-
-# 轉換為DataFrame
-adjusted_absorption_df = pd.DataFrame(adjusted_absorption_results)
+adjusted_absorption_df = calculate_adjusted_absorption_batch(net_absorption_df, target_seasons, analysis_date)
 
 print(f"✅ 完成 {len(adjusted_absorption_df)} 筆調整去化率計算")
 
@@ -834,57 +798,70 @@ def validate_absorption_rates(absorption_df):
         'quality_metrics': {}
     }
     
-    # 過濾成功計算的記錄
-    valid_data = absorption_df[absorption_df['calculation_status'] == 'success'].copy()
-    validation_report['valid_records'] = len(valid_data)
+    # 過濾成功計算的記錄，各欄位只取出一次底層陣列
+    valid_mask = (absorption_df['calculation_status'] == 'success').to_numpy()
+    n_valid = int(np.count_nonzero(valid_mask))
+    validation_report['valid_records'] = n_valid
     
-    if len(valid_data) == 0:
+    if n_valid == 0:
         validation_report['validation_errors'].append("沒有有效的計算記錄")
         return validation_report
     
+    columns = {
+        col: absorption_df[col].to_numpy()[valid_mask]
+        for col in ['net_absorption_rate', 'adjusted_absorption_rate', 'cumulative_transactions',
+                    'cumulative_cancellations', 'net_transactions', 'adjustment_factor', 'cancellation_rate']
+        if col in absorption_df.columns
+    }
+    net = columns.get('net_absorption_rate')
+    adj = columns.get('adjusted_absorption_rate')
+    
     # 驗證1: 去化率不能超過100%
-    if 'net_absorption_rate' in valid_data.columns:
-        over_100_net = valid_data[valid_data['net_absorption_rate'] > 100]
-        if len(over_100_net) > 0:
-            validation_report['validation_errors'].append(f"發現 {len(over_100_net)} 筆淨去化率超過100%")
+    if net is not None:
+        n_over_100_net = int(np.count_nonzero(net > 100))
+        if n_over_100_net > 0:
+            validation_report['validation_errors'].append(f"發現 {n_over_100_net} 筆淨去化率超過100%")
     
-    if 'adjusted_absorption_rate' in valid_data.columns:
-        over_100_adj = valid_data[valid_data['adjusted_absorption_rate'] > 100]
-        if len(over_100_adj) > 0:
-            validation_report['warning_cases'].append(f"發現 {len(over_100_adj)} 筆調整去化率超過100%")
+    if adj is not None:
+        n_over_100_adj = int(np.count_nonzero(adj > 100))
+        if n_over_100_adj > 0:
+            validation_report['warning_cases'].append(f"發現 {n_over_100_adj} 筆調整去化率超過100%")
     
     # 驗證2: 解約數不能超過成交數
-    if 'cumulative_cancellations' in valid_data.columns and 'cumulative_transactions' in valid_data.columns:
-        invalid_cancellation = valid_data[valid_data['cumulative_cancellations'] > valid_data['cumulative_transactions']]
-        if len(invalid_cancellation) > 0:
-            validation_report['validation_errors'].append(f"發現 {len(invalid_cancellation)} 筆解約數超過成交數")
+    if 'cumulative_cancellations' in columns and 'cumulative_transactions' in columns:
+        n_invalid_cancellation = int(np.count_nonzero(
+            columns['cumulative_cancellations'] > columns['cumulative_transactions']
+        ))
+        if n_invalid_cancellation > 0:
+            validation_report['validation_errors'].append(f"發現 {n_invalid_cancellation} 筆解約數超過成交數")
     
     # 驗證3: 淨成交數不能為負數
-    if 'net_transactions' in valid_data.columns:
-        negative_net = valid_data[valid_data['net_transactions'] < 0]
-        if len(negative_net) > 0:
-            validation_report['validation_errors'].append(f"發現 {len(negative_net)} 筆淨成交數為負數")
+    if 'net_transactions' in columns:
+        n_negative_net = int(np.count_nonzero(columns['net_transactions'] < 0))
+        if n_negative_net > 0:
+            validation_report['validation_errors'].append(f"發現 {n_negative_net} 筆淨成交數為負數")
     
     # 驗證4: 異常高去化率檢查 (超過150%為異常)
-    if 'adjusted_absorption_rate' in valid_data.columns:
-        extreme_high = valid_data[valid_data['adjusted_absorption_rate'] > 150]
-        if len(extreme_high) > 0:
-            validation_report['warning_cases'].append(f"發現 {len(extreme_high)} 筆調整去化率超過150%")
+    if adj is not None:
+        n_extreme_high = int(np.count_nonzero(adj > 150))
+        if n_extreme_high > 0:
+            validation_report['warning_cases'].append(f"發現 {n_extreme_high} 筆調整去化率超過150%")
     
     # 驗證5: 調整係數合理性檢查
-    if 'adjustment_factor' in valid_data.columns:
-        extreme_adjustment = valid_data[valid_data['adjustment_factor'] > 4.0]
-        if len(extreme_adjustment) > 0:
-            validation_report['warning_cases'].append(f"發現 {len(extreme_adjustment)} 筆調整係數超過4.0")
-    
-    # 計算品質指標
-    if len(valid_data) > 0:
-        validation_report['quality_metrics'] = {
-            'valid_calculation_rate': len(valid_data) / len(absorption_df) * 100,
-            'zero_absorption_rate': len(valid_data[valid_data.get('net_absorption_rate', 0) == 0]) / len(valid_data) * 100,
-            'high_absorption_rate': len(valid_data[valid_data.get('net_absorption_rate', 0) > 80]) / len(valid_data) * 100,
-            'average_cancellation_rate': valid_data.get('cancellation_rate', pd.Series([0])).mean()
-        }
+    if 'adjustment_factor' in columns:
+        n_extreme_adjustment = int(np.count_nonzero(columns['adjustment_factor'] > 4.0))
+        if n_extreme_adjustment > 0:
+            validation_report['warning_cases'].append(f"發現 {n_extreme_adjustment} 筆調整係數超過4.0")
+    
+    # 計算品質指標 (缺少淨去化率欄位時視為 0；平均解約率與 Series.mean 相同略過缺值)
+    if net is None:
+        net = np.zeros(n_valid)
+    validation_report['quality_metrics'] = {
+        'valid_calculation_rate': n_valid / len(absorption_df) * 100,
+        'zero_absorption_rate': np.count_nonzero(net == 0) / n_valid * 100,
+        'high_absorption_rate': np.count_nonzero(net > 80) / n_valid * 100,
+        'average_cancellation_rate': float(np.nanmean(columns['cancellation_rate'])) if 'cancellation_rate' in columns else 0.0
+    }
     
     return validation_report
 
@@ -895,6 +872,19 @@ print("🔄 執行去化率合理性驗證...")
 # 合併所有去化率計算結果進行驗證
 combined_absorption_df = adjusted_absorption_df.copy()
 
+# 重複值多的字串欄位轉為類別，比較、分組與計數皆以整數代碼運算
+for category_col in ['calculation_status', 'county', 'district']:
+    combined_absorption_df[category_col] = combined_absorption_df[category_col].astype('category')
+
+# 年季依時間排序一次並設為有序類別，後續依年季分組即按時間順序輸出，無需再排序
+ordered_seasons = sorted(target_seasons, key=season_to_number)
+combined_absorption_df['target_season'] = pd.Categorical(
+    combined_absorption_df['target_season'], categories=ordered_seasons, ordered=True
+)
+
+# 成功計算的列遮罩只計算一次，供異常識別、基準值建立與視覺化共用
+success_mask = combined_absorption_df['calculation_status'].to_numpy() == 'success'
+
 validation_result = validate_absorption_rates(combined_absorption_df)
 
 print(f"✅ 完成去化率合理性驗證")
@@ -935,13 +925,14 @@ if quality_metrics:
 print("🚨 異常案例識別與處理")
 print("=" * 60)
 
-def identify_anomalous_cases(absorption_df, thresholds=None):
+def identify_anomalous_cases(absorption_df, thresholds=None, success_mask=None):
     """
     識別異常的去化率案例
     
     Args:
         absorption_df: 去化率計算結果
         thresholds: 異常判斷閾值
+        success_mask: 預先計算的成功計算列遮罩 (未提供時即時計算)
         
     Returns:
         dict: 異常案例分析結果
@@ -955,7 +946,10 @@ def identify_anomalous_cases(absorption_df, thresholds=None):
             'suspicious_zero_absorption': 0.1
         }
     
-    valid_data = absorption_df[absorption_df['calculation_status'] == 'success'].copy()
+    # 只做唯讀篩選，不需複製
+    if success_mask is None:
+        success_mask = absorption_df['calculation_status'].to_numpy() == 'success'
+    valid_data = absorption_df.loc[success_mask]
     
     anomalous_cases = {
         'extreme_high_absorption': [],
@@ -968,79 +962,101 @@ def identify_anomalous_cases(absorption_df, thresholds=None):
     if len(valid_data) == 0:
         return anomalous_cases
     
+    def column_values(name, default):
+        """取出欄位的陣列，缺少欄位時以預設值填滿"""
+        if name in valid_data.columns:
+            return valid_data[name].to_numpy()
+        return np.full(len(valid_data), default)
+    
+    def matched_rows(mask):
+        """依陣列遮罩取出命中的少數列"""
+        return valid_data.iloc[np.flatnonzero(mask)]
+    
+    def extract_cases(cases, column_defaults):
+        """依欄位順序一次轉出案例紀錄，缺少的欄位補上預設值"""
+        missing = {col: default for col, default in column_defaults.items() if col not in cases.columns}
+        return cases.assign(**missing)[list(column_defaults)].to_dict('records')
+    
     # 1. 極端高去化率案例
     if 'adjusted_absorption_rate' in valid_data.columns:
-        extreme_high = valid_data[valid_data['adjusted_absorption_rate'] > thresholds['extreme_high_absorption']]
-        for _, case in extreme_high.iterrows():
-            anomalous_cases['extreme_high_absorption'].append({
-                'project_code': case['project_code'],
-                'project_name': case.get('project_name', ''),
-                'county': case.get('county', ''),
-                'target_season': case['target_season'],
-                'adjusted_absorption_rate': case['adjusted_absorption_rate'],
-                'net_absorption_rate': case.get('net_absorption_rate', 0),
-                'total_units': case.get('total_units', 0),
-                'cumulative_transactions': case.get('cumulative_transactions', 0)
-            })
+        extreme_high = matched_rows(np.greater(
+            column_values('adjusted_absorption_rate', 0), thresholds['extreme_high_absorption']
+        ))
+        anomalous_cases['extreme_high_absorption'] = extract_cases(extreme_high, {
+            'project_code': '',
+            'project_name': '',
+            'county': '',
+            'target_season': '',
+            'adjusted_absorption_rate': 0,
+            'net_absorption_rate': 0,
+            'total_units': 0,
+            'cumulative_transactions': 0
+        })
     
     # 2. 極端調整係數案例
     if 'adjustment_factor' in valid_data.columns:
-        extreme_adj = valid_data[valid_data['adjustment_factor'] > thresholds['extreme_adjustment_factor']]
-        for _, case in extreme_adj.iterrows():
-            anomalous_cases['extreme_adjustment'].append({
-                'project_code': case['project_code'],
-                'project_name': case.get('project_name', ''),
-                'target_season': case['target_season'],
-                'adjustment_factor': case['adjustment_factor'],
-                'season_sales_days': case.get('season_sales_days', 0),
-                'season_total_days': case.get('season_total_days', 0),
-                'is_complete_season': case.get('is_complete_season', True)
-            })
+        extreme_adj = matched_rows(np.greater(
+            column_values('adjustment_factor', 1.0), thresholds['extreme_adjustment_factor']
+        ))
+        anomalous_cases['extreme_adjustment'] = extract_cases(extreme_adj, {
+            'project_code': '',
+            'project_name': '',
+            'target_season': '',
+            'adjustment_factor': 0,
+            'season_sales_days': 0,
+            'season_total_days': 0,
+            'is_complete_season': True
+        })
     
     # 3. 高解約率案例
     if 'cancellation_rate' in valid_data.columns:
-        high_cancel = valid_data[valid_data['cancellation_rate'] > thresholds['high_cancellation_rate']]
-        for _, case in high_cancel.iterrows():
-            anomalous_cases['high_cancellation'].append({
-                'project_code': case['project_code'],
-                'project_name': case.get('project_name', ''),
-                'county': case.get('county', ''),
-                'target_season': case['target_season'],
-                'cancellation_rate': case['cancellation_rate'],
-                'cumulative_transactions': case.get('cumulative_transactions', 0),
-                'cumulative_cancellations': case.get('cumulative_cancellations', 0)
-            })
+        high_cancel = matched_rows(np.greater(
+            column_values('cancellation_rate', 0), thresholds['high_cancellation_rate']
+        ))
+        anomalous_cases['high_cancellation'] = extract_cases(high_cancel, {
+            'project_code': '',
+            'project_name': '',
+            'county': '',
+            'target_season': '',
+            'cancellation_rate': 0,
+            'cumulative_transactions': 0,
+            'cumulative_cancellations': 0
+        })
     
     # 4. 可疑模式識別
     # 識別單戶數但高交易量的案例
-    suspicious_single_unit = valid_data[
-        (valid_data.get('total_units', 1) == 1) & 
-        (valid_data.get('cumulative_transactions', 0) > 1)
-    ]
-    for _, case in suspicious_single_unit.iterrows():
-        anomalous_cases['suspicious_patterns'].append({
-            'project_code': case['project_code'],
-            'issue_type': '單戶數高交易量',
-            'total_units': case.get('total_units', 0),
-            'cumulative_transactions': case.get('cumulative_transactions', 0),
-            'details': f"戶數: {case.get('total_units', 0)}, 交易: {case.get('cumulative_transactions', 0)}"
-        })
+    total_units = column_values('total_units', 1)
+    cumulative_transactions = column_values('cumulative_transactions', 0)
+    suspicious_single_unit = matched_rows(np.logical_and(total_units == 1, cumulative_transactions > 1))
+    suspicious_single_unit = suspicious_single_unit.assign(
+        **{col: 0 for col in ['total_units', 'cumulative_transactions'] if col not in suspicious_single_unit.columns}
+    )
+    anomalous_cases['suspicious_patterns'] = extract_cases(
+        suspicious_single_unit.assign(
+            issue_type='單戶數高交易量',
+            details='戶數: ' + suspicious_single_unit['total_units'].astype(str)
+                    + ', 交易: ' + suspicious_single_unit['cumulative_transactions'].astype(str)
+        ),
+        {'project_code': '', 'issue_type': '', 'total_units': 0, 'cumulative_transactions': 0, 'details': ''}
+    )
     
     # 5. 資料品質問題
     # 檢查有完整資訊但計算異常的案例
-    complete_info_errors = valid_data[
-        (valid_data.get('has_complete_info', False) == True) & 
-        (valid_data.get('net_absorption_rate', 0) == 0) &
-        (valid_data.get('cumulative_transactions', 0) > 0)
-    ]
-    for _, case in complete_info_errors.iterrows():
-        anomalous_cases['data_quality_issues'].append({
-            'project_code': case['project_code'],
-            'issue_type': '完整資訊但零去化率',
-            'cumulative_transactions': case.get('cumulative_transactions', 0),
-            'total_units': case.get('total_units', 0),
-            'details': f"有 {case.get('cumulative_transactions', 0)} 筆交易但去化率為0"
-        })
+    complete_info_errors = matched_rows(
+        (column_values('has_complete_info', False) == True) &
+        (column_values('net_absorption_rate', 0) == 0) &
+        (cumulative_transactions > 0)
+    )
+    complete_info_errors = complete_info_errors.assign(
+        **{col: 0 for col in ['total_units', 'cumulative_transactions'] if col not in complete_info_errors.columns}
+    )
+    anomalous_cases['data_quality_issues'] = extract_cases(
+        complete_info_errors.assign(
+            issue_type='完整資訊但零去化率',
+            details='有 ' + complete_info_errors['cumulative_transactions'].astype(str) + ' 筆交易但去化率為0'
+        ),
+        {'project_code': '', 'issue_type': '', 'cumulative_transactions': 0, 'total_units': 0, 'details': ''}
+    )
     
     return anomalous_cases
 
@@ -1048,7 +1064,7 @@ def identify_anomalous_cases(absorption_df, thresholds=None):
 # 執行異常案例識別
 print("🔄 執行異常案例識別...")
 
-anomalous_analysis = identify_anomalous_cases(combined_absorption_df)
+anomalous_analysis = identify_anomalous_cases(combined_absorption_df, success_mask=success_mask)
 
 print(f"✅ 完成異常案例識別")
 print(f"\n📊 異常案例統計:")
@@ -1067,26 +1083,30 @@ if total_anomalies > 0:
     # 極端高去化率案例
     if anomalous_analysis['extreme_high_absorption']:
         print(f"\n1. 極端高去化率案例 (前5個):")
-        for i, case in enumerate(anomalous_analysis['extreme_high_absorption'][:5], 1):
-            print(f"   {i}. {case['project_code']} | {case['county']} | 去化率: {case['adjusted_absorption_rate']:.1f}% | 戶數: {case['total_units']}")
+        top_cases = pd.DataFrame(anomalous_analysis['extreme_high_absorption'][:5])
+        for i, case in enumerate(top_cases.itertuples(index=False), 1):
+            print(f"   {i}. {case.project_code} | {case.county} | 去化率: {case.adjusted_absorption_rate:.1f}% | 戶數: {case.total_units}")
     
     # 極端調整係數案例
     if anomalous_analysis['extreme_adjustment']:
         print(f"\n2. 極端調整係數案例 (前5個):")
-        for i, case in enumerate(anomalous_analysis['extreme_adjustment'][:5], 1):
-            print(f"   {i}. {case['project_code']} | 調整係數: {case['adjustment_factor']:.3f} | 銷售天數: {case['season_sales_days']}")
+        top_cases = pd.DataFrame(anomalous_analysis['extreme_adjustment'][:5])
+        for i, case in enumerate(top_cases.itertuples(index=False), 1):
+            print(f"   {i}. {case.project_code} | 調整係數: {case.adjustment_factor:.3f} | 銷售天數: {case.season_sales_days}")
     
     # 高解約率案例
     if anomalous_analysis['high_cancellation']:
         print(f"\n3. 高解約率案例 (前5個):")
-        for i, case in enumerate(anomalous_analysis['high_cancellation'][:5], 1):
-            print(f"   {i}. {case['project_code']} | {case['county']} | 解約率: {case['cancellation_rate']:.1f}% | 解約: {case['cumulative_cancellations']}")
+        top_cases = pd.DataFrame(anomalous_analysis['high_cancellation'][:5])
+        for i, case in enumerate(top_cases.itertuples(index=False), 1):
+            print(f"   {i}. {case.project_code} | {case.county} | 解約率: {case.cancellation_rate:.1f}% | 解約: {case.cumulative_cancellations}")
     
     # 可疑模式案例
     if anomalous_analysis['suspicious_patterns']:
         print(f"\n4. 可疑模式案例:")
-        for i, case in enumerate(anomalous_analysis['suspicious_patterns'][:3], 1):
-            print(f"   {i}. {case['project_code']} | {case['issue_type']} | {case['details']}")
+        top_cases = pd.DataFrame(anomalous_analysis['suspicious_patterns'][:3])
+        for i, case in enumerate(top_cases.itertuples(index=False), 1):
+            print(f"   {i}. {case.project_code} | {case.issue_type} | {case.details}")
 
 # %% [markdown]
 # ## 8. 去化率基準值建立
@@ -1096,18 +1116,48 @@ if total_anomalies > 0:
 print("📏 去化率基準值建立")
 print("=" * 60)
 
-def establish_absorption_benchmarks(absorption_df):
+def calculate_distribution_stats(values, quantiles):
+    """
+    排序一次後同時取得平均值、標準差與各分位數
+    
+    分位數以排序後陣列線性內插，與 pandas quantile 的預設算法一致
+    
+    Args:
+        values: 數值 Series (缺值不列入計算)
+        quantiles: 分位數清單
+        
+    Returns:
+        tuple: (平均值, 標準差, 各分位數值陣列)
+    """
+    arr = np.sort(values.dropna().to_numpy(dtype='float64'))
+    n = len(arr)
+    if n == 0:
+        return np.nan, np.nan, np.full(len(quantiles), np.nan)
+    
+    positions = np.asarray(quantiles, dtype='float64') * (n - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, n - 1)
+    quantile_values = arr[lower] + (arr[upper] - arr[lower]) * (positions - lower)
+    
+    std = arr.std(ddof=1) if n > 1 else np.nan
+    return arr.mean(), std, quantile_values
+
+def establish_absorption_benchmarks(absorption_df, success_mask=None):
     """
     建立去化率基準值和分級標準
     
     Args:
         absorption_df: 去化率計算結果
+        success_mask: 預先計算的成功計算列遮罩 (未提供時即時計算)
         
     Returns:
         dict: 基準值和分級標準
     """
     
-    valid_data = absorption_df[absorption_df['calculation_status'] == 'success'].copy()
+    # 只做唯讀統計，不需複製
+    if success_mask is None:
+        success_mask = absorption_df['calculation_status'].to_numpy() == 'success'
+    valid_data = absorption_df.loc[success_mask]
     
     if len(valid_data) == 0:
         return {}
@@ -1116,56 +1166,64 @@ def establish_absorption_benchmarks(absorption_df):
     
     # 基於淨去化率建立基準值
     if 'net_absorption_rate' in valid_data.columns:
-        net_rates = valid_data['net_absorption_rate']
+        # 平均值、標準差與各分位數共用一次排序
+        net_mean, net_std, (q10, q25, q50, q75, q90) = calculate_distribution_stats(
+            valid_data['net_absorption_rate'], [0.1, 0.25, 0.5, 0.75, 0.9]
+        )
         
         benchmarks['net_absorption_rate'] = {
-            'mean': net_rates.mean(),
-            'median': net_rates.median(),
-            'std': net_rates.std(),
+            'mean': net_mean,
+            'median': q50,
+            'std': net_std,
             'percentiles': {
-                '10th': net_rates.quantile(0.1),
-                '25th': net_rates.quantile(0.25),
-                '75th': net_rates.quantile(0.75),
-                '90th': net_rates.quantile(0.9)
+                '10th': q10,
+                '25th': q25,
+                '50th': q50,
+                '75th': q75,
+                '90th': q90
             },
             'classification': {
-                'high_performance': net_rates.quantile(0.75),  # 前25%
-                'good_performance': net_rates.quantile(0.5),   # 前50%
-                'average_performance': net_rates.quantile(0.25), # 前75%
+                'high_performance': q75,     # 前25%
+                'good_performance': q50,     # 前50%
+                'average_performance': q25,  # 前75%
                 'below_average': 0  # 低於平均
             }
         }
     
     # 基於解約率建立基準值
     if 'cancellation_rate' in valid_data.columns:
-        cancel_rates = valid_data['cancellation_rate']
+        # 平均值、標準差與各分位數共用一次排序
+        cancel_mean, cancel_std, (q10, q25, q50, q75, q90, q95) = calculate_distribution_stats(
+            valid_data['cancellation_rate'], [0.1, 0.25, 0.5, 0.75, 0.9, 0.95]
+        )
         
         benchmarks['cancellation_rate'] = {
-            'mean': cancel_rates.mean(),
-            'median': cancel_rates.median(),
-            'std': cancel_rates.std(),
+            'mean': cancel_mean,
+            'median': q50,
+            'std': cancel_std,
             'percentiles': {
-                '10th': cancel_rates.quantile(0.1),
-                '25th': cancel_rates.quantile(0.25),
-                '75th': cancel_rates.quantile(0.75),
-                '90th': cancel_rates.quantile(0.9)
+                '10th': q10,
+                '25th': q25,
+                '50th': q50,
+                '75th': q75,
+                '90th': q90
             },
             'risk_classification': {
-                'low_risk': cancel_rates.quantile(0.5),      # 低於中位數
-                'medium_risk': cancel_rates.quantile(0.75),  # 75分位數
-                'high_risk': cancel_rates.quantile(0.9),     # 90分位數
-                'extreme_risk': cancel_rates.quantile(0.95)  # 95分位數
+                'low_risk': q50,      # 低於中位數
+                'medium_risk': q75,   # 75分位數
+                'high_risk': q90,     # 90分位數
+                'extreme_risk': q95   # 95分位數
             }
         }
     
     # 基於銷售規模建立基準值
     if 'total_units' in valid_data.columns:
-        unit_sizes = valid_data['total_units']
+        _, _, (q33, q67, q100) = calculate_distribution_stats(valid_data['total_units'], [0.33, 0.67, 1.0])
         
         benchmarks['project_scale'] = {
-            'small_project': unit_sizes.quantile(0.33),    # 小型建案
-            'medium_project': unit_sizes.quantile(0.67),   # 中型建案
-            'large_project': unit_sizes.quantile(1.0)      # 大型建案
+            'small_project': q33,    # 小型建案
+            'medium_project': q67,   # 中型建案
+            'large_project': q100    # 大型建案
         }
     
     # 綜合分級標準
@@ -1194,7 +1252,7 @@ def establish_absorption_benchmarks(absorption_df):
 # 建立去化率基準值
 print("🔄 建立去化率基準值...")
 
-absorption_benchmarks = establish_absorption_benchmarks(combined_absorption_df)
+absorption_benchmarks = establish_absorption_benchmarks(combined_absorption_df, success_mask=success_mask)
 
 print(f"✅ 完成去化率基準值建立")
 
@@ -1236,92 +1294,100 @@ if absorption_benchmarks:
 
 # %%
 # 應用基準值進行建案分級
-def apply_absorption_grading(absorption_df, benchmarks):
+def apply_absorption_grading(absorption_df, benchmarks, inplace=False):
     """
     應用基準值對建案進行分級
     
     Args:
         absorption_df: 去化率計算結果
         benchmarks: 基準值標準
+        inplace: 是否直接在 absorption_df 新增分級欄位 (預設不修改原資料)
         
     Returns:
         DataFrame: 包含分級結果的資料
     """
     
-    graded_df = absorption_df.copy()
+    if 'net_absorption_rate' not in absorption_df.columns or not benchmarks:
+        return absorption_df if inplace else absorption_df.copy()
+    
+    # 只計算分級欄位，不複製整份資料
+    grade_columns = {}
     
-    if 'net_absorption_rate' not in graded_df.columns or not benchmarks:
-        return graded_df
+    def grade_by_thresholds(values, thresholds, labels, right=False):
+        """依遞增門檻以 np.digitize 一次分級，缺值標記為 unknown"""
+        values = values.to_numpy(dtype='float64', na_value=np.nan)
+        grades = np.asarray(labels, dtype=object)[np.digitize(values, thresholds, right=right)]
+        return np.where(np.isnan(values), 'unknown', grades)
     
-    # 去化率分級
+    # 去化率分級 (達門檻即歸入較高等級)
     net_bench = benchmarks.get('net_absorption_rate', {})
     if 'classification' in net_bench:
-        def classify_absorption(rate):
-            if pd.isna(rate):
-                return 'unknown'
-            elif rate >= net_bench['classification']['high_performance']:
-                return 'high_performance'
-            elif rate >= net_bench['classification']['good_performance']:
-                return 'good_performance'
-            elif rate >= net_bench['classification']['average_performance']:
-                return 'average_performance'
-            else:
-                return 'below_average'
-        
-        graded_df['absorption_grade'] = graded_df['net_absorption_rate'].apply(classify_absorption)
+        classification = net_bench['classification']
+        grade_columns['absorption_grade'] = grade_by_thresholds(
+            absorption_df['net_absorption_rate'],
+            [classification['average_performance'], classification['good_performance'],
+             classification['high_performance']],
+            ['below_average', 'average_performance', 'good_performance', 'high_performance']
+        )
     
     # 解約風險分級
     cancel_bench = benchmarks.get('cancellation_rate', {})
     if 'risk_classification' in cancel_bench:
-        def classify_cancellation_risk(rate):
-            if pd.isna(rate):
-                return 'unknown'
-            elif rate >= cancel_bench['risk_classification']['extreme_risk']:
-                return 'extreme_risk'
-            elif rate >= cancel_bench['risk_classification']['high_risk']:
-                return 'high_risk'
-            elif rate >= cancel_bench['risk_classification']['medium_risk']:
-                return 'medium_risk'
-            else:
-                return 'low_risk'
-        
-        graded_df['cancellation_risk_grade'] = graded_df['cancellation_rate'].apply(classify_cancellation_risk)
+        risk_classification = cancel_bench['risk_classification']
+        grade_columns['cancellation_risk_grade'] = grade_by_thresholds(
+            absorption_df['cancellation_rate'],
+            [risk_classification['medium_risk'], risk_classification['high_risk'],
+             risk_classification['extreme_risk']],
+            ['low_risk', 'medium_risk', 'high_risk', 'extreme_risk']
+        )
     
-    # 建案規模分級
+    # 建案規模分級 (不超過門檻即歸入較小等級)
     scale_bench = benchmarks.get('project_scale', {})
     if scale_bench:
-        def classify_project_scale(units):
-            if pd.isna(units):
-                return 'unknown'
-            elif units <= scale_bench['small_project']:
-                return 'small'
-            elif units <= scale_bench['medium_project']:
-                return 'medium'
-            else:
-                return 'large'
-        
-        graded_df['project_scale_grade'] = graded_df['total_units'].apply(classify_project_scale)
+        grade_columns['project_scale_grade'] = grade_by_thresholds(
+            absorption_df['total_units'],
+            [scale_bench['small_project'], scale_bench['medium_project']],
+            ['small', 'medium', 'large'],
+            right=True
+        )
+    
+    if inplace:
+        for grade_col, grades in grade_columns.items():
+            absorption_df[grade_col] = grades
+        return absorption_df
     
-    return graded_df
+    return absorption_df.drop(columns=list(grade_columns), errors='ignore').join(
+        pd.DataFrame(grade_columns, index=absorption_df.index)
+    )
 
 # 應用分級標準
 print(f"\n🔄 應用基準值進行建案分級...")
 
-graded_absorption_df = apply_absorption_grading(combined_absorption_df, absorption_benchmarks)
+# combined_absorption_df 之後不再單獨使用，直接就地新增分級欄位
+graded_absorption_df = apply_absorption_grading(combined_absorption_df, absorption_benchmarks, inplace=True)
+
+# 分級欄位同樣轉為類別
+for grade_col in ['absorption_grade', 'cancellation_risk_grade', 'project_scale_grade']:
+    if grade_col in graded_absorption_df.columns:
+        graded_absorption_df[grade_col] = graded_absorption_df[grade_col].astype('category')
+
+# 分級結果統計 (各分級筆數只計算一次，分析總結沿用)
+n_graded = len(graded_absorption_df)
+grade_counts = {}
+risk_counts = {}
 
-# 分級結果統計
 if 'absorption_grade' in graded_absorption_df.columns:
-    grade_distribution = graded_absorption_df['absorption_grade'].value_counts()
+    grade_counts = graded_absorption_df['absorption_grade'].value_counts().to_dict()
     print(f"\n📊 去化率分級分布:")
-    for grade, count in grade_distribution.items():
-        percentage = count / len(graded_absorption_df) * 100
+    for grade, count in grade_counts.items():
+        percentage = count / n_graded * 100
         print(f"   {grade}: {count} 個 ({percentage:.1f}%)")
 
 if 'cancellation_risk_grade' in graded_absorption_df.columns:
-    risk_distribution = graded_absorption_df['cancellation_risk_grade'].value_counts()
+    risk_counts = graded_absorption_df['cancellation_risk_grade'].value_counts().to_dict()
     print(f"\n📊 解約風險分級分布:")
-    for risk, count in risk_distribution.items():
-        percentage = count / len(graded_absorption_df) * 100
+    for risk, count in risk_counts.items():
+        percentage = count / n_graded * 100
         print(f"   {risk}: {count} 個 ({percentage:.1f}%)")
 
 # %% [markdown]
@@ -1335,8 +1401,8 @@ print("=" * 50)
 # 創建圖表
 fig, axes = plt.subplots(3, 3, figsize=(20, 15))
 
-# 過濾有效數據
-valid_data = graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']
+# 過濾有效數據 (分級結果與 combined_absorption_df 列順序相同，沿用同一遮罩)
+valid_data = graded_absorption_df.loc[success_mask]
 
 # 1. 淨去化率分布直方圖
 if 'net_absorption_rate' in valid_data.columns:
@@ -1358,8 +1424,9 @@ if 'cancellation_rate' in valid_data.columns:
 
 # 3. 調整係數分布
 if 'adjustment_factor' in valid_data.columns:
-    adjustment_data = valid_data[valid_data['adjustment_factor'] <= 5]  # 過濾極端值
-    axes[0, 2].hist(adjustment_data['adjustment_factor'], bins=20, alpha=0.7, color='lightgreen', edgecolor='black')
+    adjustment_values = valid_data['adjustment_factor'].to_numpy(dtype=np.float64)
+    adjustment_values = adjustment_values[adjustment_values <= 5]  # 過濾極端值
+    axes[0, 2].hist(adjustment_values, bins=20, alpha=0.7, color='lightgreen', edgecolor='black')
     axes[0, 2].set_title('調整係數分布', fontsize=14, fontweight='bold')
     axes[0, 2].set_xlabel('調整係數')
     axes[0, 2].set_ylabel('建案數量')
@@ -1368,18 +1435,16 @@ if 'adjustment_factor' in valid_data.columns:
 
 # 4. 年季別去化率變化
 if len(target_seasons) > 1:
-    season_stats = []
-    for season in target_seasons:
-        season_data = valid_data[valid_data['target_season'] == season]
-        if not season_data.empty:
-            season_stats.append({
-                'season': season,
-                'mean_absorption': season_data['net_absorption_rate'].mean(),
-                'count': len(season_data)
-            })
-    
-    if season_stats:
-        season_df = pd.DataFrame(season_stats)
+    # 一次分組計算各年季平均去化率，有序類別已依時間排列，僅保留有資料的年季
+    season_df = (
+        valid_data.groupby('target_season', observed=True)['net_absorption_rate']
+        .agg(mean_absorption='mean', count='size')
+        .dropna()
+        .rename_axis('season')
+        .reset_index()
+    )
+    
+    if not season_df.empty:
         bars = axes[1, 0].bar(season_df['season'], season_df['mean_absorption'], color='orange')
         axes[1, 0].set_title('各年季平均淨去化率', fontsize=14, fontweight='bold')
         axes[1, 0].set_xlabel('年季')
@@ -1394,7 +1459,7 @@ if len(target_seasons) > 1:
 
 # 5. 去化率分級分布
 if 'absorption_grade' in valid_data.columns:
-    grade_dist = valid_data['absorption_grade'].value_counts()
+    grade_dist = valid_data['absorption_grade'].value_counts().loc[lambda counts: counts > 0]
     colors = {'high_performance': 'green', 'good_performance': 'lightgreen', 
               'average_performance': 'orange', 'below_average': 'red', 'unknown': 'gray'}
     bar_colors = [colors.get(grade, 'gray') for grade in grade_dist.index]
@@ -1413,7 +1478,7 @@ if 'absorption_grade' in valid_data.columns:
 
 # 6. 解約風險分級分布
 if 'cancellation_risk_grade' in valid_data.columns:
-    risk_dist = valid_data['cancellation_risk_grade'].value_counts()
+    risk_dist = valid_data['cancellation_risk_grade'].value_counts().loc[lambda counts: counts > 0]
     risk_colors = {'low_risk': 'green', 'medium_risk': 'orange', 
                    'high_risk': 'red', 'extreme_risk': 'darkred', 'unknown': 'gray'}
     bar_colors = [risk_colors.get(risk, 'gray') for risk in risk_dist.index]
@@ -1432,9 +1497,14 @@ if 'cancellation_risk_grade' in valid_data.columns:
 
 # 7. 縣市別去化率比較
 if 'county' in valid_data.columns:
-    city_absorption = valid_data.groupby('county')['net_absorption_rate'].agg(['mean', 'count']).reset_index()
-    city_absorption = city_absorption[city_absorption['count'] >= 5]  # 至少5個建案
-    city_absorption = city_absorption.nlargest(10, 'mean')  # 前10名
+    # 一次分組彙總後篩選至少5個建案，取平均去化率前10名
+    city_absorption = (
+        valid_data.groupby('county', sort=False, observed=True)['net_absorption_rate']
+        .agg(mean='mean', count='count')
+        .loc[lambda stats: stats['count'] >= 5]
+        .nlargest(10, 'mean')
+        .reset_index()
+    )
     
     if not city_absorption.empty:
         bars = axes[2, 0].bar(range(len(city_absorption)), city_absorption['mean'], color='lightblue')
@@ -1453,26 +1523,33 @@ if 'county' in valid_data.columns:
 
 # 8. 去化率 vs 解約率散點圖
 if 'net_absorption_rate' in valid_data.columns and 'cancellation_rate' in valid_data.columns:
-    scatter_data = valid_data[(valid_data['net_absorption_rate'] <= 150) & (valid_data['cancellation_rate'] <= 20)]
-    axes[2, 1].scatter(scatter_data['net_absorption_rate'], scatter_data['cancellation_rate'], 
-                      alpha=0.6, color='purple')
+    # 只取兩個欄位的陣列做遮罩，不建立篩選後的 DataFrame
+    net_values = valid_data['net_absorption_rate'].to_numpy(dtype=np.float64)
+    cancel_values = valid_data['cancellation_rate'].to_numpy(dtype=np.float64)
+    scatter_mask = (net_values <= 150) & (cancel_values <= 20)
+    x = net_values[scatter_mask]
+    y = cancel_values[scatter_mask]
+    axes[2, 1].scatter(x, y, alpha=0.6, color='purple')
     axes[2, 1].set_title('去化率 vs 解約率關係', fontsize=14, fontweight='bold')
     axes[2, 1].set_xlabel('淨去化率 (%)')
     axes[2, 1].set_ylabel('解約率 (%)')
     
-    # 添加趨勢線
-    if len(scatter_data) > 1:
-        z = np.polyfit(scatter_data['net_absorption_rate'], scatter_data['cancellation_rate'], 1)
-        p = np.poly1d(z)
-        axes[2, 1].plot(scatter_data['net_absorption_rate'], p(scatter_data['net_absorption_rate']), 
-                       "r--", alpha=0.8, label=f'趨勢線')
-        axes[2, 1].legend()
+    # 添加趨勢線 (一次線性迴歸以封閉解計算，樣本過少時不繪製)
+    if len(x) >= 5:
+        x_dev = x - x.mean()
+        x_var = np.square(x_dev).sum()
+        if x_var > 0:
+            slope = (x_dev * (y - y.mean())).sum() / x_var
+            intercept = y.mean() - slope * x.mean()
+            axes[2, 1].plot(x, slope * x + intercept, "r--", alpha=0.8, label=f'趨勢線')
+            axes[2, 1].legend()
 
 # 9. 建案規模 vs 去化率
 if 'total_units' in valid_data.columns and 'net_absorption_rate' in valid_data.columns:
-    size_data = valid_data[(valid_data['total_units'] <= 1000) & (valid_data['net_absorption_rate'] <= 150)]
-    axes[2, 2].scatter(size_data['total_units'], size_data['net_absorption_rate'], 
-                      alpha=0.6, color='green')
+    unit_values = valid_data['total_units'].to_numpy(dtype=np.float64)
+    net_values = valid_data['net_absorption_rate'].to_numpy(dtype=np.float64)
+    size_mask = (unit_values <= 1000) & (net_values <= 150)
+    axes[2, 2].scatter(unit_values[size_mask], net_values[size_mask], alpha=0.6, color='green')
     axes[2, 2].set_title('建案規模 vs 去化率', fontsize=14, fontweight='bold')
     axes[2, 2].set_xlabel('總戶數')
     axes[2, 2].set_ylabel('淨去化率 (%)')
@@ -1498,12 +1575,14 @@ output_columns = [
 
 # 合併毛去化率和淨去化率結果
 if 'gross_absorption_rate' not in graded_absorption_df.columns:
-    # 添加毛去化率資料
-    gross_lookup = {f"{row['project_code']}_{row['target_season']}": row['gross_absorption_rate'] 
-                   for _, row in gross_absorption_df.iterrows()}
-    graded_absorption_df['gross_absorption_rate'] = graded_absorption_df.apply(
-        lambda x: gross_lookup.get(f"{x['project_code']}_{x['target_season']}", x.get('net_absorption_rate', 0)), 
-        axis=1
+    # 添加毛去化率資料 (依建案與年季一次 merge，找不到者沿用淨去化率)
+    graded_absorption_df = graded_absorption_df.merge(
+        gross_absorption_df[['project_code', 'target_season', 'gross_absorption_rate']]
+        .drop_duplicates(['project_code', 'target_season'], keep='last'),
+        on=['project_code', 'target_season'], how='left'
+    )
+    graded_absorption_df['gross_absorption_rate'] = graded_absorption_df['gross_absorption_rate'].fillna(
+        graded_absorption_df['net_absorption_rate']
     )
 
 # 選擇存在的欄位
@@ -1522,6 +1601,11 @@ absorption_output_df.to_csv('../data/processed/05_absorption_rate_analysis.csv',
                            index=False, encoding='utf-8-sig')
 print("✅ 去化率分析結果已儲存至: ../data/processed/05_absorption_rate_analysis.csv")
 
+# 同步輸出 Parquet (分級、縣市等類別欄位以字典編碼儲存，供後續 Notebook 快速載入)
+absorption_output_df.to_parquet('../data/processed/05_absorption_rate_analysis.parquet',
+                                index=False, compression='zstd')
+print("✅ 去化率分析結果已儲存至: ../data/processed/05_absorption_rate_analysis.parquet")
+
 # 2. 儲存基準值標準
 if absorption_benchmarks:
     benchmark_summary = []
@@ -1557,39 +1641,56 @@ if absorption_benchmarks:
         benchmark_df.to_csv('../data/processed/05_absorption_benchmarks.csv', 
                            index=False, encoding='utf-8-sig')
         print("✅ 去化率基準值已儲存至: ../data/processed/05_absorption_benchmarks.csv")
+        
+        benchmark_df.to_parquet('../data/processed/05_absorption_benchmarks.parquet',
+                                index=False, compression='zstd')
+        print("✅ 去化率基準值已儲存至: ../data/processed/05_absorption_benchmarks.parquet")
 
 # 3. 儲存異常案例報告
 if total_anomalies > 0:
-    anomaly_records = []
+    anomaly_columns = ['anomaly_category', 'project_code', 'project_name', 'county',
+                       'target_season', 'issue_type', 'details']
+    anomaly_frames = []
     
+    # 各類異常案例直接建成 DataFrame，缺少的欄位補上預設值後一次合併
     for category, cases in anomalous_analysis.items():
-        for case in cases:
-            anomaly_record = {
-                'anomaly_category': category,
-                'project_code': case.get('project_code', ''),
-                'project_name': case.get('project_name', ''),
-                'county': case.get('county', ''),
-                'target_season': case.get('target_season', ''),
-                'issue_type': case.get('issue_type', category),
-                'details': case.get('details', str(case))
-            }
-            anomaly_records.append(anomaly_record)
+        if not cases:
+            continue
+        
+        category_df = pd.DataFrame(cases)
+        category_df['anomaly_category'] = category
+        if 'issue_type' not in category_df.columns:
+            category_df['issue_type'] = category
+        if 'details' not in category_df.columns:
+            category_df['details'] = [str(case) for case in cases]
+        anomaly_frames.append(category_df.reindex(columns=anomaly_columns, fill_value=''))
     
-    if anomaly_records:
-        anomaly_df = pd.DataFrame(anomaly_records)
+    if anomaly_frames:
+        anomaly_df = pd.concat(anomaly_frames, ignore_index=True)
         anomaly_df.to_csv('../data/processed/05_anomalous_cases.csv', 
                          index=False, encoding='utf-8-sig')
         print("✅ 異常案例報告已儲存至: ../data/processed/05_anomalous_cases.csv")
+        
+        anomaly_df.to_parquet('../data/processed/05_anomalous_cases.parquet',
+                              index=False, compression='zstd')
+        print("✅ 異常案例報告已儲存至: ../data/processed/05_anomalous_cases.parquet")
 
 # 4. 儲存計算總結報告
+# 成功計算遮罩與平均值只計算一次 (合併毛去化率後重新取得)，分析總結沿用
+success_mask = graded_absorption_df['calculation_status'].to_numpy() == 'success'
+successful_calcs = int(success_mask.sum())
+valid_data = graded_absorption_df.loc[success_mask]
+average_net_absorption_rate = valid_data['net_absorption_rate'].mean()
+average_cancellation_rate = valid_data['cancellation_rate'].mean()
+
 summary_report = {
     'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
     'target_seasons': ', '.join(target_seasons),
-    'total_records_processed': len(graded_absorption_df),
-    'successful_calculations': len(graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']),
-    'calculation_success_rate': len(graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']) / len(graded_absorption_df) * 100,
-    'average_net_absorption_rate': graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']['net_absorption_rate'].mean(),
-    'average_cancellation_rate': graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']['cancellation_rate'].mean(),
+    'total_records_processed': n_graded,
+    'successful_calculations': successful_calcs,
+    'calculation_success_rate': successful_calcs / n_graded * 100,
+    'average_net_absorption_rate': average_net_absorption_rate,
+    'average_cancellation_rate': average_cancellation_rate,
     'total_anomalous_cases': total_anomalies,
     'validation_errors': len(validation_result.get('validation_errors', [])),
     'warning_cases': len(validation_result.get('warning_cases', []))
@@ -1604,124 +1705,132 @@ print("✅ 計算總結報告已儲存至: ../data/processed/05_calculation_summ
 # ## 11. 分析總結與下一步
 
 # %%
-# 去化率計算分析總結
-print("📋 去化率計算分析總結")
-print("=" * 80)
+# 去化率計算分析總結 (各行先收集，最後一次輸出)
+report_lines = []
+report_lines.append("📋 去化率計算分析總結")
+report_lines.append("=" * 80)
 
-print("1️⃣ 計算完成度:")
-successful_calcs = len(graded_absorption_df[graded_absorption_df['calculation_status'] == 'success'])
-total_calcs = len(graded_absorption_df)
+report_lines.append("1️⃣ 計算完成度:")
+total_calcs = n_graded
 success_rate = successful_calcs / total_calcs * 100 if total_calcs > 0 else 0
 
-print(f"   ✅ 總計算記錄: {total_calcs:,}")
-print(f"   ✅ 成功計算: {successful_calcs:,}")
-print(f"   ✅ 成功率: {success_rate:.1f}%")
-print(f"   ✅ 涵蓋年季: {len(target_seasons)} 季")
+report_lines.append(f"   ✅ 總計算記錄: {total_calcs:,}")
+report_lines.append(f"   ✅ 成功計算: {successful_calcs:,}")
+report_lines.append(f"   ✅ 成功率: {success_rate:.1f}%")
+report_lines.append(f"   ✅ 涵蓋年季: {len(target_seasons)} 季")
 
-print(f"\n2️⃣ 核心指標統計:")
+report_lines.append(f"\n2️⃣ 核心指標統計:")
 if successful_calcs > 0:
-    valid_data = graded_absorption_df[graded_absorption_df['calculation_status'] == 'success']
-    
-    print(f"   📊 平均淨去化率: {valid_data['net_absorption_rate'].mean():.1f}%")
-    print(f"   📊 中位數淨去化率: {valid_data['net_absorption_rate'].median():.1f}%")
-    print(f"   📊 平均解約率: {valid_data['cancellation_rate'].mean():.2f}%")
-    print(f"   📊 高去化率建案 (≥70%): {len(valid_data[valid_data['net_absorption_rate'] >= 70]):,} 個")
-    print(f"   📊 低去化率建案 (<30%): {len(valid_data[valid_data['net_absorption_rate'] < 30]):,} 個")
+    report_lines.append(f"   📊 平均淨去化率: {average_net_absorption_rate:.1f}%")
+    report_lines.append(f"   📊 中位數淨去化率: {valid_data['net_absorption_rate'].median():.1f}%")
+    report_lines.append(f"   📊 平均解約率: {average_cancellation_rate:.2f}%")
+    report_lines.append(f"   📊 高去化率建案 (≥70%): {len(valid_data[valid_data['net_absorption_rate'] >= 70]):,} 個")
+    report_lines.append(f"   📊 低去化率建案 (<30%): {len(valid_data[valid_data['net_absorption_rate'] < 30]):,} 個")
 
-print(f"\n3️⃣ 品質驗證結果:")
-print(f"   ✅ 驗證錯誤: {len(validation_result.get('validation_errors', []))} 個")
-print(f"   ⚠️ 警告案例: {len(validation_result.get('warning_cases', []))} 個")
-print(f"   🚨 異常案例: {total_anomalies} 個")
+report_lines.append(f"\n3️⃣ 品質驗證結果:")
+report_lines.append(f"   ✅ 驗證錯誤: {len(validation_result.get('validation_errors', []))} 個")
+report_lines.append(f"   ⚠️ 警告案例: {len(validation_result.get('warning_cases', []))} 個")
+report_lines.append(f"   🚨 異常案例: {total_anomalies} 個")
 
 if absorption_benchmarks:
-    print(f"   ✅ 基準值建立: 完成")
+    report_lines.append(f"   ✅ 基準值建立: 完成")
 else:
-    print(f"   ❌ 基準值建立: 失敗")
+    report_lines.append(f"   ❌ 基準值建立: 失敗")
 
-print(f"\n4️⃣ 分級結果:")
-if 'absorption_grade' in graded_absorption_df.columns:
-    grade_counts = graded_absorption_df['absorption_grade'].value_counts()
-    print(f"   去化率分級:")
+report_lines.append(f"\n4️⃣ 分級結果:")
+if grade_counts:
+    report_lines.append(f"   去化率分級:")
     for grade, count in grade_counts.items():
-        percentage = count / len(graded_absorption_df) * 100
-        print(f"     {grade}: {count} 個 ({percentage:.1f}%)")
+        percentage = count / n_graded * 100
+        report_lines.append(f"     {grade}: {count} 個 ({percentage:.1f}%)")
 
-if 'cancellation_risk_grade' in graded_absorption_df.columns:
-    risk_counts = graded_absorption_df['cancellation_risk_grade'].value_counts()
-    print(f"   解約風險分級:")
+if risk_counts:
+    report_lines.append(f"   解約風險分級:")
     for risk, count in risk_counts.items():
-        percentage = count / len(graded_absorption_df) * 100
-        print(f"     {risk}: {count} 個 ({percentage:.1f}%)")
+        percentage = count / n_graded * 100
+        report_lines.append(f"     {risk}: {count} 個 ({percentage:.1f}%)")
 
-print(f"\n5️⃣ 關鍵發現:")
+report_lines.append(f"\n5️⃣ 關鍵發現:")
 
 # 分析趨勢
 if len(target_seasons) > 1:
-    season_trends = []
-    for season in sorted(target_seasons, key=season_to_number):
-        season_data = valid_data[valid_data['target_season'] == season]
-        if not season_data.empty:
-            avg_absorption = season_data['net_absorption_rate'].mean()
-            season_trends.append((season, avg_absorption))
+    season_trends = list(
+        valid_data.groupby('target_season', observed=True)['net_absorption_rate'].mean()
+        .dropna()
+        .items()
+    )
     
     if len(season_trends) >= 2:
         trend_direction = "上升" if season_trends[-1][1] > season_trends[0][1] else "下降"
-        print(f"   📈 去化率趨勢: {trend_direction} ({season_trends[0][1]:.1f}% → {season_trends[-1][1]:.1f}%)")
+        report_lines.append(f"   📈 去化率趨勢: {trend_direction} ({season_trends[0][1]:.1f}% → {season_trends[-1][1]:.1f}%)")
 
 # 縣市分析
 if 'county' in valid_data.columns:
-    city_performance = valid_data.groupby('county')['net_absorption_rate'].agg(['mean', 'count']).reset_index()
+    city_performance = valid_data.groupby('county', observed=True)['net_absorption_rate'].agg(['mean', 'count']).reset_index()
     city_performance = city_performance[city_performance['count'] >= 3]  # 至少3個建案
     
     if not city_performance.empty:
-        best_city = city_performance.loc[city_performance['mean'].idxmax()]
-        worst_city = city_performance.loc[city_performance['mean'].idxmin()]
-        print(f"   🏆 最佳表現縣市: {best_city['county']} ({best_city['mean']:.1f}%)")
-        print(f"   ⚠️ 待改善縣市: {worst_city['county']} ({worst_city['mean']:.1f}%)")
-
-print(f"\n6️⃣ 品質建議:")
+        # 以位置索引取出最佳與最差縣市，避免標籤查找與整列物件建立
+        city_names = city_performance['county'].to_numpy()
+        city_means = city_performance['mean'].to_numpy()
+        best_idx, worst_idx = city_means.argmax(), city_means.argmin()
+        report_lines.append(f"   🏆 最佳表現縣市: {city_names[best_idx]} ({city_means[best_idx]:.1f}%)")
+        report_lines.append(f"   ⚠️ 待改善縣市: {city_names[worst_idx]} ({city_means[worst_idx]:.1f}%)")
+
+report_lines.append(f"\n6️⃣ 品質建議:")
 if len(validation_result.get('validation_errors', [])) > 0:
-    print("   ❌ 需修正的驗證錯誤，建議檢查資料邏輯")
+    report_lines.append("   ❌ 需修正的驗證錯誤，建議檢查資料邏輯")
 
 if total_anomalies > 20:
-    print("   ⚠️ 異常案例較多，建議加強資料清理")
+    report_lines.append("   ⚠️ 異常案例較多，建議加強資料清理")
 
 if success_rate < 90:
-    print("   ⚠️ 計算成功率偏低，建議檢查資料完整性")
+    report_lines.append("   ⚠️ 計算成功率偏低，建議檢查資料完整性")
 
-print(f"\n7️⃣ 下一步工作:")
-print("   🎯 進行去化動態分析 (速度/加速度計算)")
-print("   📊 建立社區級32欄位完整報告")
-print("   🏘️ 進行行政區級聚合分析")
-print("   🌟 實作銷售階段判斷邏輯")
-print("   📈 建立完售時間預測模型")
+report_lines.append(f"\n7️⃣ 下一步工作:")
+report_lines.append("   🎯 進行去化動態分析 (速度/加速度計算)")
+report_lines.append("   📊 建立社區級32欄位完整報告")
+report_lines.append("   🏘️ 進行行政區級聚合分析")
+report_lines.append("   🌟 實作銷售階段判斷邏輯")
+report_lines.append("   📈 建立完售時間預測模型")
+
+print("\n".join(report_lines))
 
 # %%
 # 核心指標準備情況檢查
-print(f"\n🔍 社區級報告核心指標準備情況:")
-
-required_indicators = {
-    '毛去化率': 'gross_absorption_rate' in graded_absorption_df.columns,
-    '淨去化率': 'net_absorption_rate' in graded_absorption_df.columns,
-    '調整去化率': 'adjusted_absorption_rate' in graded_absorption_df.columns,
-    '解約率': 'cancellation_rate' in graded_absorption_df.columns,
-    '完整季判斷': 'is_complete_season' in graded_absorption_df.columns,
-    '調整係數': 'adjustment_factor' in graded_absorption_df.columns,
-    '計算狀態': 'calculation_status' in graded_absorption_df.columns,
-    '分級結果': 'absorption_grade' in graded_absorption_df.columns
-}
-
-print("核心指標檢查:")
-for indicator, status in required_indicators.items():
-    status_icon = "✅" if status else "❌"
-    print(f"   {status_icon} {indicator}")
-
-all_indicators_ready = all(required_indicators.values())
+report_lines = []
+report_lines.append(f"\n🔍 社區級報告核心指標準備情況:")
+
+# 核心指標與對應欄位 (指標名稱, 欄位名稱)
+CORE_INDICATORS = (
+    ('毛去化率', 'gross_absorption_rate'),
+    ('淨去化率', 'net_absorption_rate'),
+    ('調整去化率', 'adjusted_absorption_rate'),
+    ('解約率', 'cancellation_rate'),
+    ('完整季判斷', 'is_complete_season'),
+    ('調整係數', 'adjustment_factor'),
+    ('計算狀態', 'calculation_status'),
+    ('分級結果', 'absorption_grade')
+)
+
+# 欄位集合只建立一次，以集合交集判斷各指標欄位是否存在
+present_columns = set(graded_absorption_df.columns).intersection(col for _, col in CORE_INDICATORS)
+required_indicators = {indicator: col in present_columns for indicator, col in CORE_INDICATORS}
+
+report_lines.append("核心指標檢查:")
+report_lines.extend(
+    f"   {'✅' if status else '❌'} {indicator}" for indicator, status in required_indicators.items()
+)
+
+# 缺少的指標與完成旗標一次取得
+missing_indicators = [indicator for indicator, status in required_indicators.items() if not status]
+all_indicators_ready = not missing_indicators
 if all_indicators_ready:
-    print(f"\n🎉 所有核心指標準備完成，可以進行社區級報告生成")
+    report_lines.append(f"\n🎉 所有核心指標準備完成，可以進行社區級報告生成")
 else:
-    missing_indicators = [k for k, v in required_indicators.items() if not v]
-    print(f"\n⚠️ 以下指標需要補強: {', '.join(missing_indicators)}")
+    report_lines.append(f"\n⚠️ 以下指標需要補強: {', '.join(missing_indicators)}")
+
+print("\n".join(report_lines))
 
 # %% [markdown]
 # ## 12. 計算邏輯驗證
@@ -761,6 +761,11 @@ clean_transaction_df.to_csv('../data/processed/03_clean_transactions.csv',
                            index=False, encoding='utf-8-sig')
 print("✅ 乾淨交易資料已儲存至: ../data/processed/03_clean_transactions.csv")
 
+# 同步輸出 Parquet (欄位型別與字串字典編碼一併保存，供後續 Notebook 快速載入)
+clean_transaction_df.to_parquet('../data/processed/03_clean_transactions.parquet',
+                                index=False, compression='snappy')
+print("✅ 乾淨交易資料已儲存至: ../data/processed/03_clean_transactions.parquet")
+
 # 3. 儲存重複交易分析結果
 if not valid_results_df.empty:
     duplicate_analysis_summary = valid_results_df[[
@@ -1054,6 +1054,11 @@ if active_projects_result:
     active_results_df.to_csv('../data/processed/04_active_projects_analysis.csv', 
                              index=False, encoding='utf-8-sig')
     print("✅ 活躍建案分析結果已儲存至: ../data/processed/04_active_projects_analysis.csv")
+    
+    # 同步輸出 Parquet (欄位型別與字串字典編碼一併保存，供後續 Notebook 快速載入)
+    active_results_df.to_parquet('../data/processed/04_active_projects_analysis.parquet',
+                                 index=False, compression='snappy')
+    print("✅ 活躍建案分析結果已儲存至: ../data/processed/04_active_projects_analysis.parquet")
 
 # 2. 儲存滯銷建案分析結果
 if stagnant_analysis_result: